@@ -0,0 +1,543 @@
+"""In-process fakes of the AWS IoT shadow service and the Hatch REST API.
+
+Used by the load tests in this directory, which put custom_components/hatch
+on sys.path before importing it.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable
+from urllib.parse import urlparse
+from uuid import uuid4
+
+from awscrt import mqtt
+
+from api.const import API_URL, MAX_IOT_VALUE, PRODUCT_REST_MINI, PRODUCT_REST_PLUS
+
+_LOGGER = logging.getLogger(__name__)
+
+SHADOW_TOPIC_PREFIX = "$aws/things/"
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[index]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def merge(current: dict, update: dict) -> dict:
+    for key, value in update.items():
+        if isinstance(value, dict):
+            current[key] = merge(current.get(key, {}), value)
+        else:
+            current[key] = value
+    return current
+
+
+def changes(current: dict, update: dict) -> dict:
+    """Return the leaves of update that differ from current."""
+    changed = {}
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(current.get(key), dict):
+            if nested := changes(current[key], value):
+                changed[key] = nested
+        elif key not in current or current[key] != value:
+            changed[key] = value
+    return changed
+
+
+def rest_plus_reported(rng: random.Random) -> dict:
+    def color() -> dict:
+        return {
+            "r": rng.randrange(MAX_IOT_VALUE),
+            "g": rng.randrange(MAX_IOT_VALUE),
+            "b": rng.randrange(MAX_IOT_VALUE),
+            "i": rng.randrange(MAX_IOT_VALUE),
+            "W": False,
+            "R": False,
+        }
+
+    return {
+        "connected": True,
+        "isPowered": True,
+        "deviceInfo": {"f": "03.42.00", "b": 80},
+        "activePresetIndex": 0,
+        "activeProgramIndex": 0,
+        "a": {"t": 2, "v": MAX_IOT_VALUE // 2},
+        "c": color(),
+        "clock": {"b": MAX_IOT_VALUE // 4, "f": 32768},
+        "presets": {
+            str(index): {"a": {"t": index, "v": MAX_IOT_VALUE // 4}, "c": color(), "f": 128}
+            for index in range(1, 5)
+        },
+        "programs": {
+            str(index): {
+                "a": {"t": index, "v": MAX_IOT_VALUE // 4},
+                "c": color(),
+                "n": f"Program {index}",
+                "f": 128,
+            }
+            for index in range(1, 3)
+        },
+    }
+
+
+def rest_mini_reported(rng: random.Random) -> dict:
+    return {
+        "connected": True,
+        "deviceInfo": {"f": "01.10.00"},
+        "current": {"playing": "remote", "sound": {"id": 2, "v": MAX_IOT_VALUE // 2}},
+    }
+
+
+def random_change(product: str, rng: random.Random) -> dict:
+    if product == PRODUCT_REST_MINI:
+        return {"current": {"sound": {"v": rng.randrange(MAX_IOT_VALUE)}}}
+    return rng.choice(
+        [
+            {"c": {"i": rng.randrange(MAX_IOT_VALUE)}},
+            {"a": {"v": rng.randrange(MAX_IOT_VALUE)}},
+            {"clock": {"b": rng.randrange(MAX_IOT_VALUE)}},
+        ]
+    )
+
+
+REPORTED_FACTORIES = {
+    PRODUCT_REST_MINI: rest_mini_reported,
+    PRODUCT_REST_PLUS: rest_plus_reported,
+}
+
+
+class FakeThing:
+
+    def __init__(self, iot_device: dict, reported: dict):
+        self.iot_device = iot_device
+        self.product = iot_device["product"]
+        self.thing_name = iot_device["thingName"]
+        self.reported = reported
+        self.version = 1
+
+
+class FakeShadowBroker:
+    """In-process stand-in for the AWS IoT shadow service and Hatch devices.
+
+    Messages are delivered from the broker's own thread, the way awscrt
+    delivers them from its event loop group, after a configurable latency.
+    Devices apply desired state and report it back like real units do,
+    either all of it or, with report_changes_only, just the values that
+    changed.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        reorder_rate: float = 0.0,
+        device_latency: float = 0.0,
+        reject_rate: float = 0.0,
+        report_changes_only: bool = False,
+        allow_wildcards: bool = True,
+        seed: int | None = None,
+    ):
+        self.allow_wildcards = allow_wildcards
+        self.latency = latency
+        self.jitter = jitter
+        self.reorder_rate = reorder_rate
+        self.device_latency = device_latency
+        self.reject_rate = reject_rate
+        self.report_changes_only = report_changes_only
+        self.connections: list[FakeMqttConnection] = []
+        self.messages_delivered = 0
+        self.messages_dropped = 0
+        self.things: dict[str, FakeThing] = {}
+        # Guards subscriptions, which callers change from their own threads
+        # while the broker thread matches topics against them.
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._rng = random.Random(seed)
+        self._simulation: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> FakeShadowBroker:
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="fake-shadow-broker", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def add_device(self, product: str = PRODUCT_REST_PLUS, name: str | None = None) -> dict:
+        index = len(self.things)
+        iot_device = {
+            "id": index,
+            "macAddress": f"fa:ce:00:00:{index // 256:02x}:{index % 256:02x}",
+            "name": name or f"Fake {index}",
+            "product": product,
+            "thingName": f"fake-{product}-{index}",
+            "hardwareVersion": "fake",
+        }
+        thing = FakeThing(iot_device, REPORTED_FACTORIES[product](self._rng))
+        self.things[thing.thing_name] = thing
+        return iot_device
+
+    def add_devices(self, count: int, product: str = PRODUCT_REST_PLUS) -> list[dict]:
+        return [self.add_device(product) for _ in range(count)]
+
+    @property
+    def iot_devices(self) -> list[dict]:
+        return [thing.iot_device for thing in self.things.values()]
+
+    def connection_factory(self, **kwargs) -> FakeMqttConnection:
+        # Accepts the keyword arguments of the awsiot connection builders.
+        connection = FakeMqttConnection(
+            broker=self,
+            client_id=kwargs.get("client_id"),
+            on_connection_interrupted=kwargs.get("on_connection_interrupted"),
+            on_connection_resumed=kwargs.get("on_connection_resumed"),
+        )
+        with self._lock:
+            self.connections.append(connection)
+        return connection
+
+    def call_soon(self, callback: Callable, *args) -> None:
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def _delay(self) -> float:
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        if self.reorder_rate and self._rng.random() < self.reorder_rate:
+            # Held back long enough for messages sent after it to overtake it.
+            delay += 2 * (self.latency + self.jitter) + 0.001
+        return delay
+
+    def _complete(self, future: Future, result: Any) -> None:
+        self._loop.call_soon_threadsafe(self._loop.call_later, self._delay(), future.set_result, result)
+
+    def _publish(self, topic: str, payload: dict) -> None:
+        # Runs on the broker thread.
+        data = json.dumps(payload).encode()
+        with self._lock:
+            targets = [
+                (connection, topic_filter, callback)
+                for connection in self.connections
+                for topic_filter, callback in connection.subscriptions.items()
+            ]
+        for connection, topic_filter, callback in targets:
+            if callback is not None and topic_matches(topic_filter, topic):
+                self._loop.call_later(self._delay(), connection._deliver, callback, topic, data)
+
+    def _receive(self, topic: str, payload: bytes) -> None:
+        # Runs on the broker thread.
+        if not topic.startswith(SHADOW_TOPIC_PREFIX):
+            return
+        thing_name, _, operation = topic[len(SHADOW_TOPIC_PREFIX):].partition("/shadow/")
+        if (thing := self.things.get(thing_name)) is None:
+            return
+        request = json.loads(payload or b"{}")
+        base = f"{SHADOW_TOPIC_PREFIX}{thing_name}/shadow"
+        if operation == "get":
+            self._publish(
+                f"{base}/get/accepted",
+                {
+                    "state": {"reported": thing.reported},
+                    "version": thing.version,
+                    "timestamp": int(time.time()),
+                    "clientToken": request.get("clientToken"),
+                },
+            )
+        elif operation == "update":
+            desired = request.get("state", {}).get("desired") or {}
+            if self.reject_rate and self._rng.random() < self.reject_rate:
+                self._publish(
+                    f"{base}/update/rejected",
+                    {
+                        "code": 400,
+                        "message": "Rejected by fake broker",
+                        "timestamp": int(time.time()),
+                        "clientToken": request.get("clientToken"),
+                    },
+                )
+                return
+            thing.version += 1
+            self._publish(
+                f"{base}/update/accepted",
+                {
+                    "state": {"desired": desired},
+                    "version": thing.version,
+                    "timestamp": int(time.time()),
+                    "clientToken": request.get("clientToken"),
+                },
+            )
+            self._loop.call_later(self.device_latency, self._report, thing, desired)
+
+    def _report(self, thing: FakeThing, reported: dict) -> None:
+        if self.report_changes_only and not (reported := changes(thing.reported, reported)):
+            return
+        merge(thing.reported, reported)
+        thing.version += 1
+        self._publish(
+            f"{SHADOW_TOPIC_PREFIX}{thing.thing_name}/shadow/update/accepted",
+            {
+                "state": {"reported": reported},
+                "version": thing.version,
+                "timestamp": int(time.time()),
+            },
+        )
+
+    def report(self, thing_name: str, reported: dict) -> None:
+        """Change a device's state as if it was changed on the device itself."""
+        self.call_soon(self._report, self.things[thing_name], reported)
+
+    def start_simulation(self, rate: float) -> None:
+        """Report random changes at ``rate`` updates per second across all devices."""
+
+        async def simulate() -> None:
+            things = list(self.things.values())
+            while True:
+                await asyncio.sleep(self._rng.expovariate(rate))
+                thing = self._rng.choice(things)
+                self._report(thing, random_change(thing.product, self._rng))
+
+        def start() -> None:
+            self._simulation = self._loop.create_task(simulate())
+
+        self.stop_simulation()
+        self.call_soon(start)
+
+    def stop_simulation(self) -> None:
+        def stop() -> None:
+            if self._simulation is not None:
+                self._simulation.cancel()
+                self._simulation = None
+
+        self.call_soon(stop)
+
+    def interrupt(self, duration: float | None = None) -> None:
+        """Drop every connection, resuming after ``duration`` seconds if given."""
+        for connection in list(self.connections):
+            self.call_soon(connection._interrupt, duration)
+
+
+class FakeMqttConnection(mqtt.Connection):
+    """An awscrt MQTT connection backed by a FakeShadowBroker.
+
+    Subclasses the real connection so IotShadowClient accepts it, but never
+    creates the native binding.
+    """
+
+    def __init__(
+        self,
+        broker: FakeShadowBroker,
+        client_id: str | None = None,
+        on_connection_interrupted: Callable | None = None,
+        on_connection_resumed: Callable | None = None,
+    ):
+        self.broker = broker
+        self.client_id = client_id or str(uuid4())
+        self.connected = False
+        self.subscriptions: dict[str, Callable | None] = {}
+        self._on_connection_interrupted = on_connection_interrupted
+        self._on_connection_resumed = on_connection_resumed
+        self._packet_id = 0
+
+    def _next_packet_id(self) -> int:
+        self._packet_id += 1
+        return self._packet_id
+
+    def _deliver(self, callback: Callable, topic: str, payload: bytes) -> None:
+        if not self.connected:
+            self.broker.messages_dropped += 1
+            return
+        self.broker.messages_delivered += 1
+        try:
+            callback(topic=topic, payload=payload, dup=False, qos=mqtt.QoS.AT_LEAST_ONCE, retain=False)
+        except Exception:
+            _LOGGER.exception(f"Fake broker callback failed for {topic}")
+
+    def _interrupt(self, duration: float | None) -> None:
+        if not self.connected:
+            return
+        self.connected = False
+        if self._on_connection_interrupted is not None:
+            self._on_connection_interrupted(connection=self, error=Exception("fake interruption"))
+        if duration is not None:
+            self.broker._loop.call_later(duration, self._resume)
+
+    def _resume(self) -> None:
+        if self.connected:
+            return
+        self.connected = True
+        if self._on_connection_resumed is not None:
+            self._on_connection_resumed(
+                connection=self,
+                return_code=mqtt.ConnectReturnCode.ACCEPTED,
+                session_present=True,
+            )
+
+    def connect(self) -> Future:
+        future = Future()
+
+        def connect() -> None:
+            self.connected = True
+            with self.broker._lock:
+                if self not in self.broker.connections:
+                    self.broker.connections.append(self)
+
+        self.broker.call_soon(connect)
+        self.broker._complete(future, dict(return_code=0, session_present=False))
+        return future
+
+    def reconnect(self) -> Future:
+        return self.connect()
+
+    def disconnect(self) -> Future:
+        future = Future()
+
+        def disconnect() -> None:
+            self.connected = False
+
+        self.broker.call_soon(disconnect)
+        self.broker._complete(future, dict())
+        return future
+
+    def subscribe(self, topic, qos, callback=None) -> tuple[Future, int]:
+        future = Future()
+        packet_id = self._next_packet_id()
+        if not self.broker.allow_wildcards and ("+" in topic or "#" in topic):
+            future.set_exception(mqtt.SubscribeError(topic))
+            return future, packet_id
+        with self.broker._lock:
+            self.subscriptions[topic] = callback
+        self.broker._complete(future, dict(packet_id=packet_id, topic=topic, qos=qos))
+        return future, packet_id
+
+    def unsubscribe(self, topic) -> tuple[Future, int]:
+        future = Future()
+        packet_id = self._next_packet_id()
+        with self.broker._lock:
+            self.subscriptions.pop(topic, None)
+        self.broker._complete(future, dict(packet_id=packet_id))
+        return future, packet_id
+
+    def resubscribe_existing_topics(self) -> tuple[Future, int]:
+        future = Future()
+        packet_id = self._next_packet_id()
+        with self.broker._lock:
+            topics = [(topic, mqtt.QoS.AT_LEAST_ONCE) for topic in self.subscriptions]
+        self.broker._complete(future, dict(packet_id=packet_id, topics=topics))
+        return future, packet_id
+
+    def publish(self, topic, payload, qos, retain=False) -> tuple[Future, int]:
+        future = Future()
+        packet_id = self._next_packet_id()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        if not self.connected:
+            future.set_exception(ConnectionError("fake connection is not connected"))
+            return future, packet_id
+
+        def publish() -> None:
+            self.broker._loop.call_later(self.broker._delay(), self.broker._receive, topic, payload)
+
+        self.broker.call_soon(publish)
+        self.broker._complete(future, dict(packet_id=packet_id))
+        return future, packet_id
+
+    def get_stats(self):
+        return mqtt.OperationStatisticsData()
+
+
+class FakeResponse:
+
+    def __init__(self, status: int, body: dict):
+        self.status = status
+        self.headers = {"content-type": "application/json"}
+        self._text = json.dumps(body)
+
+    async def text(self) -> str:
+        return self._text
+
+
+class FakeClientSession:
+    """Stand-in for the aiohttp session used by Hatch and AwsHttp.
+
+    Serves login, iotDevice fetch, token fetch and Cognito credential
+    requests for the devices of a FakeShadowBroker.
+    """
+
+    def __init__(self, broker: FakeShadowBroker, latency: float = 0.0, expiration: int = 3600):
+        self.broker = broker
+        self.latency = latency
+        self.expiration = expiration
+        self.requests: list[str] = []
+        self._tokens: set[str] = set()
+
+    def expire_sessions(self) -> None:
+        self._tokens.clear()
+
+    async def close(self) -> None:
+        pass
+
+    async def post(self, url: str, json: dict = None, headers: dict = None) -> FakeResponse:
+        return await self._request(url, headers or {}, json or {})
+
+    async def get(self, url: str, headers: dict = None, params: dict = None) -> FakeResponse:
+        return await self._request(url, headers or {}, params or {})
+
+    async def _request(self, url: str, headers: dict, body: dict) -> FakeResponse:
+        await asyncio.sleep(self.latency)
+        path = url[len(API_URL):] if url.startswith(API_URL) else urlparse(url).netloc
+        self.requests.append(path)
+        if path == "public/v1/login":
+            token = str(uuid4())
+            self._tokens.add(token)
+            return FakeResponse(200, {"status": "success", "token": token})
+        if path.startswith("cognito-identity."):
+            return FakeResponse(
+                200,
+                {
+                    "IdentityId": body.get("IdentityId"),
+                    "Credentials": {
+                        "AccessKeyId": "FAKEACCESSKEY",
+                        "SecretKey": "fake-secret",
+                        "SessionToken": str(uuid4()),
+                        "Expiration": int(time.time()) + self.expiration,
+                    },
+                },
+            )
+        if headers.get("X-HatchBaby-Auth") not in self._tokens:
+            return FakeResponse(200, {"status": "failure", "errorCode": 1001})
+        if path == "service/app/iotDevice/v2/fetch":
+            return FakeResponse(200, {"status": "success", "payload": self.broker.iot_devices})
+        if path == "service/app/restPlus/token/v1/fetch":
+            return FakeResponse(
+                200,
+                {
+                    "status": "success",
+                    "payload": {
+                        "endpoint": "https://fake.iot.us-east-1.amazonaws.com",
+                        "region": "us-east-1",
+                        "identityId": "us-east-1:fake",
+                        "token": str(uuid4()),
+                    },
+                },
+            )
+        return FakeResponse(404, {"status": "failure", "errorCode": 404})
@@ -0,0 +1,159 @@
+"""Load test get_devices and command round trips against the fake broker.
+
+Starts a FakeShadowBroker with simulated Rest Plus units, connects through
+get_devices and measures setup time and command-to-state latency, i.e. the
+time from issuing a command until the device reports the new state. Entities
+see the command's optimistic state before that, so the time until the local
+state changes is printed too.
+
+    python benchmarks/fake_fleet.py --devices 200 --latency 0.02 --jitter 0.01
+    python benchmarks/fake_fleet.py --devices 50 --update-rate 100 --reorder 0.1 --interrupt 2
+    python benchmarks/fake_fleet.py --devices 50 --reject 0.2
+    python benchmarks/fake_fleet.py --devices 50 --changes-only
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "hatch")
+)
+
+from api import get_devices  # noqa: E402
+from api.const import PRODUCT_REST_PLUS  # noqa: E402
+from api.rest_plus import RestPlus  # noqa: E402
+from api.util import StageTimings, pct_to_api  # noqa: E402
+from fake import FakeClientSession, FakeShadowBroker  # noqa: E402
+
+
+async def command_latency(
+    device: RestPlus, rng: random.Random, timeout: float
+) -> tuple[float | None, float | None]:
+    volume = rng.randrange(1, 100)
+    if device.audio._volume == pct_to_api(volume):
+        volume = volume % 99 + 1
+    visible = None
+
+    def check() -> None:
+        nonlocal visible
+        if visible is None and device.audio._volume == pct_to_api(volume):
+            visible = time.perf_counter() - start
+
+    device.register_callback(check, {"a"})
+    start = time.perf_counter()
+    try:
+        await device.async_set_audio_volume(volume)
+        # A confirmed report doesn't change local state, so there's no
+        # callback to wait on.
+        while device.reported_state.get("a", {}).get("v") != pct_to_api(volume):
+            if time.perf_counter() - start > timeout:
+                return visible, None
+            await asyncio.sleep(0.001)
+        return visible, time.perf_counter() - start
+    finally:
+        device.remove_callback(check)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args: argparse.Namespace) -> int:
+    broker = FakeShadowBroker(
+        latency=args.latency,
+        jitter=args.jitter,
+        reorder_rate=args.reorder,
+        device_latency=args.device_latency,
+        reject_rate=args.reject,
+        report_changes_only=args.changes_only,
+        seed=args.seed,
+    ).start()
+    broker.add_devices(args.devices, PRODUCT_REST_PLUS)
+    session = FakeClientSession(broker, latency=args.rest_latency)
+    timings = StageTimings()
+
+    start = time.perf_counter()
+    _, mqtt_connection, devices, _ = await get_devices(
+        email="load@example.com",
+        password="fake",
+        client_session=session,
+        timings=timings,
+        connection_factory=broker.connection_factory,
+    )
+    await asyncio.sleep(2 * (args.latency + args.jitter) + 0.01)
+    setup = time.perf_counter() - start
+    print(f"setup: {setup * 1000:.1f} ms for {len(devices)} devices {timings.as_dict()}")
+    print(f"devices with state: {sum(1 for device in devices if device.is_connected)}")
+
+    if args.update_rate:
+        broker.start_simulation(args.update_rate)
+    if args.interrupt:
+        asyncio.get_running_loop().call_later(
+            args.duration / 2, broker.interrupt, args.interrupt
+        )
+
+    rng = random.Random(args.seed)
+    visible: list[float] = []
+    latencies: list[float] = []
+    timeouts = 0
+    deadline = time.perf_counter() + args.duration
+    while time.perf_counter() < deadline:
+        results = await asyncio.gather(
+            *(command_latency(device, rng, args.timeout) for device in devices)
+        )
+        visible += [shown for shown, _ in results if shown is not None]
+        latencies += [confirmed for _, confirmed in results if confirmed is not None]
+        timeouts += sum(1 for _, confirmed in results if confirmed is None)
+
+    broker.stop_simulation()
+    await asyncio.wrap_future(mqtt_connection.disconnect())
+    broker.stop()
+
+    if latencies:
+        print(
+            f"commands: {len(latencies)} ok, {timeouts} timed out, "
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+            f"max {max(latencies) * 1000:.1f} ms"
+        )
+    if visible:
+        print(
+            f"optimistic state: p50 {statistics.median(visible) * 1000:.2f} ms, "
+            f"p99 {percentile(visible, 0.99) * 1000:.2f} ms"
+        )
+    rollbacks = sum(device.metrics.counter("optimistic_rollbacks") for device in devices)
+    print(f"rollbacks: {rollbacks}")
+    print(f"broker: {broker.messages_delivered} delivered, {broker.messages_dropped} dropped")
+    return 0 if latencies else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to send commands for")
+    parser.add_argument("--latency", type=float, default=0.02, help="broker latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--reorder", type=float, default=0.0, help="fraction of messages delayed past later ones")
+    parser.add_argument("--device-latency", type=float, default=0.01)
+    parser.add_argument("--reject", type=float, default=0.0, help="fraction of updates the broker rejects")
+    parser.add_argument(
+        "--changes-only", action="store_true", help="devices report only the values that changed"
+    )
+    parser.add_argument("--rest-latency", type=float, default=0.05)
+    parser.add_argument("--update-rate", type=float, default=0.0, help="device-side updates per second")
+    parser.add_argument("--interrupt", type=float, default=0.0, help="drop the connection for this many seconds")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Offline benchmarks for the shadow update hot path.
+
+Replays synthetic GetShadowResponse/UpdateShadowResponse documents through
+RestPlus/RestMini for fleets of 1 to 500 devices and reports per-update
+latency and allocations. No Hatch account, broker or Home Assistant
+install is needed.
+
+    python benchmarks/shadow_updates.py
+    python benchmarks/shadow_updates.py --fleet 1 50 500 --json results.json
+    python benchmarks/shadow_updates.py --compare results.json --threshold 1.25
+"""
+from __future__ import annotations
+
+import argparse
+import colorsys
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "hatch")
+)
+
+from awsiot.iotshadow import GetShadowResponse, UpdateShadowResponse  # noqa: E402
+
+from api.const import PRODUCT_REST_MINI, PRODUCT_REST_PLUS  # noqa: E402
+from api.device import Device  # noqa: E402
+from api.rest_mini import RestMini  # noqa: E402
+from api.rest_plus import RestPlus  # noqa: E402
+
+DEFAULT_FLEET_SIZES = (1, 10, 100, 500)
+DEFAULT_UPDATES = 200
+DEFAULT_THRESHOLD = 1.25
+
+
+def rest_plus_document(rng: random.Random) -> dict:
+    def color() -> dict:
+        return {
+            "r": rng.randrange(65536),
+            "g": rng.randrange(65536),
+            "b": rng.randrange(65536),
+            "i": rng.randrange(65536),
+            "W": False,
+            "R": False,
+        }
+
+    return {
+        "connected": True,
+        "isPowered": True,
+        "deviceInfo": {"f": "03.42.00", "b": 80},
+        "activePresetIndex": 0,
+        "activeProgramIndex": 1,
+        "a": {"t": 2, "v": 32768},
+        "c": color(),
+        "clock": {"b": 16384, "f": 32768},
+        "presets": {
+            str(index): {"a": {"t": index, "v": 16384}, "c": color(), "f": 128}
+            for index in range(1, 7)
+        },
+        "programs": {
+            str(index): {
+                "a": {"t": index, "v": 16384},
+                "c": color(),
+                "n": f"Program {index}",
+                "f": 192,
+            }
+            for index in range(1, 4)
+        },
+    }
+
+
+def rest_plus_deltas(rng: random.Random) -> list[dict]:
+    return [
+        {"c": {"r": rng.randrange(65536), "g": rng.randrange(65536), "b": rng.randrange(65536)}},
+        {"c": {"i": rng.randrange(65536)}},
+        {"a": {"v": rng.randrange(65536)}},
+        {"presets": {str(rng.randrange(1, 7)): {"f": rng.choice([0, 128, 192])}}},
+        {"activeProgramIndex": rng.randrange(0, 4)},
+        {"connected": True},
+    ]
+
+
+def rest_mini_document(rng: random.Random) -> dict:
+    return {
+        "connected": True,
+        "deviceInfo": {"f": "01.10.00"},
+        "current": {"playing": "remote", "sound": {"id": 2, "v": 32768}},
+    }
+
+
+def rest_mini_deltas(rng: random.Random) -> list[dict]:
+    return [
+        {"current": {"sound": {"v": rng.randrange(65536)}}},
+        {"current": {"sound": {"id": rng.randrange(2, 12)}}},
+        {"current": {"playing": rng.choice(["remote", "none"])}},
+        {"connected": True},
+    ]
+
+
+def rest_plus_reads(device: RestPlus) -> None:
+    device.is_light_on
+    color = device.color
+    colorsys.rgb_to_hsv(color.red / 255, color.green / 255, color.blue / 255)
+    device.presets
+    device.active_program_name
+
+
+def rest_mini_reads(device: RestMini) -> None:
+    device.is_audio_on
+    device.audio.name
+
+
+FLAVOURS = {
+    "rest_plus": (RestPlus, PRODUCT_REST_PLUS, rest_plus_document, rest_plus_deltas, rest_plus_reads),
+    "rest_mini": (RestMini, PRODUCT_REST_MINI, rest_mini_document, rest_mini_deltas, rest_mini_reads),
+}
+
+
+def build_fleet(
+    flavour: str, size: int, updates: int, seed: int
+) -> tuple[list[Device], list[tuple[Device, object]]]:
+    device_class, product, document, deltas, _ = FLAVOURS[flavour]
+    rng = random.Random(seed)
+    devices = [
+        device_class(
+            info={
+                "name": f"{flavour}-{index}",
+                "macAddress": f"00:00:00:00:{index // 256:02x}:{index % 256:02x}",
+                "product": product,
+                "thingName": f"thing-{index}",
+            },
+            shadow_client=None,
+            save_response_enabled=False,
+        )
+        for index in range(size)
+    ]
+    # The first document each device sees is a full get-shadow reply,
+    # everything after that is a partial update-shadow reply.
+    responses = [
+        (
+            device,
+            GetShadowResponse.from_payload(
+                {"version": 1, "state": {"reported": document(rng)}}
+            ),
+        )
+        for device in devices
+    ]
+    responses += [
+        (
+            device,
+            UpdateShadowResponse.from_payload(
+                {"version": 2 + step, "state": {"reported": rng.choice(deltas(rng))}}
+            ),
+        )
+        for step in range(updates)
+        for device in devices
+    ]
+    return devices, responses
+
+
+def replay(
+    responses: list[tuple[Device, object]],
+    reads: Callable[[Device], None] | None = None,
+) -> None:
+    for device, response in responses:
+        if device._apply_reported(response.version, response.state.reported) and reads:
+            reads(device)
+
+
+def cases(flavour: str, size: int, updates: int, seed: int) -> dict[str, Callable]:
+    """Return benchmark cases, each building a fresh fleet on every call.
+
+    Replays mutate device state, so a case returns the callable to time and
+    the number of operations it performs.
+    """
+    reads = FLAVOURS[flavour][4]
+
+    def update_local_state():
+        _, responses = build_fleet(flavour, size, updates, seed)
+        return (lambda: replay(responses)), len(responses)
+
+    def update_and_read():
+        _, responses = build_fleet(flavour, size, updates, seed)
+        return (lambda: replay(responses, reads)), len(responses)
+
+    def merge_state():
+        devices, responses = build_fleet(flavour, size, updates, seed)
+        merge = devices[0]._merge_state
+        documents = [response.state.reported for _, response in responses]
+        return (lambda: [merge({}, document) for document in documents]), len(documents)
+
+    def property_reads():
+        devices, responses = build_fleet(flavour, size, updates, seed)
+        replay(responses)
+        return (
+            (lambda: [reads(device) for _ in range(updates) for device in devices]),
+            len(devices) * updates,
+        )
+
+    return {
+        "update_local_state": update_local_state,
+        "update_and_read": update_and_read,
+        "merge_state": merge_state,
+        "property_reads": property_reads,
+    }
+
+
+def measure(setup: Callable, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        run, count = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) / count)
+    # Allocations are traced in a separate pass so tracemalloc's overhead
+    # doesn't skew the latency numbers.
+    run, count = setup()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_us": statistics.median(timings) * 1e6,
+        "min_us": min(timings) * 1e6,
+        "peak_bytes_per_op": peak / count,
+        "retained_bytes": current,
+    }
+
+
+def run_benchmarks(fleet_sizes, updates: int, repeat: int, seed: int) -> dict:
+    results = {}
+    for flavour in FLAVOURS:
+        for size in fleet_sizes:
+            for name, setup in cases(flavour, size, updates, seed).items():
+                key = f"{flavour}/{size}/{name}"
+                results[key] = measure(setup, repeat)
+                print(
+                    f"{key:40} {results[key]['median_us']:9.2f} us/op "
+                    f"{results[key]['peak_bytes_per_op']:9.1f} B/op peak "
+                    f"{results[key]['retained_bytes']:>10} B retained"
+                )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for key, result in results.items():
+        if (previous := baseline.get(key)) is None:
+            continue
+        for metric in ("median_us", "peak_bytes_per_op"):
+            if previous[metric] and result[metric] > previous[metric] * threshold:
+                regressions.append(
+                    f"{key} {metric}: {previous[metric]:.2f} -> {result[metric]:.2f}"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleet", type=int, nargs="+", default=DEFAULT_FLEET_SIZES)
+    parser.add_argument("--updates", type=int, default=DEFAULT_UPDATES, help="updates per device")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.fleet, args.updates, args.repeat, args.seed)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
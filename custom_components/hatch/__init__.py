@@ -1,26 +1,48 @@
 """The Hatch integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
 import datetime
+from functools import wraps
+from importlib import import_module
 import logging
 from subprocess import PIPE
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform, CONF_EMAIL, CONF_PASSWORD
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity import Entity, EntityDescription
-from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
+from homeassistant.helpers.storage import Store
 
 from .api.const import DEFAULT_SAVE_ENABLED
+from .api.util import NotConnectedError
 from .const import (
+    API,
+    CACHE,
+    CLIENT_BOOTSTRAP,
+    CONNECT_RETRY_INTERVAL,
+    CREDENTIALS,
     DEVICES,
     DOMAIN,
     ENTITIES,
     EXPIRATION_LISTENER,
+    FAVORITES_MANAGERS,
+    LOADED_PLATFORMS,
     MANUFACTURER,
+    METRICS,
     MQTT_CONNECTION,
+    STAGE_TIMINGS,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    STORE,
+    UNLOADED,
 )
 
 PLATFORMS = [
@@ -35,77 +57,221 @@ PLATFORMS = [
 _LOGGER = logging.getLogger(__name__)
 
 
+def platform_capabilities() -> dict[Platform, frozenset[str]]:
+    # Each platform derives its capabilities from its own descriptions, so
+    # they can't drift from the entities it actually creates.
+    return {
+        platform: import_module(f".{platform}", __name__).CAPABILITIES
+        for platform in PLATFORMS
+    }
+
+
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     data = {}
     email = config_entry.data[CONF_EMAIL]
     password = config_entry.data[CONF_PASSWORD]
 
-    async def setup_connection(arg):
+    async def connect():
         from awscrt.mqtt import Connection
-        from .api import get_devices
+        from .api import async_close_snapshot_writers, get_devices
 
-        _LOGGER.debug(f"[{config_entry.title}] Updating credentials: {arg}")
         client_session = async_get_clientsession(hass)
 
-        def disconnect():
+        def disconnect(**kwargs):
+            data[METRICS].increment("connection_interrupted")
             _LOGGER.debug(f"[{config_entry.title}] Disconnected")
 
-        def resumed():
+        def resumed(**kwargs):
+            data[METRICS].increment("connection_resumed")
             _LOGGER.debug(f"[{config_entry.title}] Resumed")
 
         if MQTT_CONNECTION in data.keys():
             mqtt_connection: Connection = data[MQTT_CONNECTION]
             try:
-                mqtt_connection.disconnect().result()
+                await asyncio.wrap_future(mqtt_connection.disconnect())
             except Exception as error:
                 _LOGGER.debug(
                     f"[{config_entry.title}] mqtt_connection disconnect failed during reconnect: {error}"
                 )
 
-        _, mqtt_connection, devices, expiration_time = await get_devices(
+        api, mqtt_connection, devices, credentials = await get_devices(
             email=email,
             password=password,
             client_session=client_session,
             on_connection_interrupted=disconnect,
             on_connection_resumed=resumed,
             save_response_enabled=DEFAULT_SAVE_ENABLED,
+            client_bootstrap=data[CLIENT_BOOTSTRAP],
+            timings=data[STAGE_TIMINGS],
+            cache=data[CACHE],
+            metrics=data[METRICS],
         )
-        _LOGGER.debug(
-            f"[{config_entry.title}] Credentials expire at: {datetime.datetime.fromtimestamp(expiration_time)}"
-        )
+        if data.get(UNLOADED):
+            # Unloaded while connecting in the background, nothing would
+            # ever disconnect this connection.
+            _LOGGER.debug(f"[{config_entry.title}] Unloaded while connecting, disconnecting")
+            await asyncio.wrap_future(mqtt_connection.disconnect())
+            raise asyncio.CancelledError
+        data[API] = api
+        data[CREDENTIALS] = credentials
         data[MQTT_CONNECTION] = mqtt_connection
 
+        if DEVICES in data:
+            await async_close_snapshot_writers(data[DEVICES])
         if ENTITIES in list(data.keys()):
-            _LOGGER.debug(
-                f"[{config_entry.title}] Updating existing entities: {data[ENTITIES]}"
-            )
+            previous = {device.info.mac_address for device in data[DEVICES]}
+            current = {device.info.mac_address for device in devices}
             for device in devices:
-                _LOGGER.debug(
-                    f"[{config_entry.title}] Looping new devices: {device.info.thing_name}, {device.info.name}"
+                for entity in list(data[ENTITIES].get(device.info.mac_address, [])):
+                    entity.replace_device(device)
+                for manager in data[FAVORITES_MANAGERS].get(device.info.mac_address, []):
+                    manager.replace_device(device)
+            if removed := previous - current:
+                _LOGGER.warning(
+                    f"[{config_entry.title}] Devices no longer reported by Hatch: {sorted(removed)}"
+                )
+            if added := current - previous:
+                _LOGGER.info(
+                    f"[{config_entry.title}] New devices found, reload the integration to add them: {sorted(added)}"
+                )
+        else:
+            data[ENTITIES] = {}
+            data[FAVORITES_MANAGERS] = {}
+        data[DEVICES] = devices
+        for device in devices:
+            device.register_callback(schedule_save)
+
+    def store_data() -> dict:
+        from .api import cache_shadows
+
+        return cache_shadows(data[CACHE], data[DEVICES])
+
+    def schedule_save() -> None:
+        data[STORE].async_delay_save(store_data, STORAGE_SAVE_DELAY)
+
+    async def setup_connection(arg):
+        from .api import rotate_credentials
+
+        _LOGGER.debug(f"[{config_entry.title}] Updating credentials: {arg}")
+
+        if CREDENTIALS in data.keys():
+            try:
+                await rotate_credentials(
+                    api=data[API],
+                    email=email,
+                    password=password,
+                    credentials=data[CREDENTIALS],
+                    mqtt_connection=data[MQTT_CONNECTION],
+                    devices=data[DEVICES],
+                    timings=data[STAGE_TIMINGS],
+                    cache=data[CACHE],
+                )
+            except Exception as error:
+                _LOGGER.warning(
+                    f"[{config_entry.title}] Credential rotation failed, reconnecting: {error}"
                 )
-                for entity in data[ENTITIES]:
-                    _LOGGER.debug(
-                        f"[{config_entry.title}] Looping existing entities: {entity.unique_id}, {entity.name}"
-                    )
-                    if device.info.mac_address in entity.unique_id:
-                        _LOGGER.debug(f"[{config_entry.title}] Matched and replacing entity's device")
-                        entity.replace_device(device)
+                data[METRICS].increment("reconnects")
+                await connect()
         else:
-            data[DEVICES] = devices
-            data[ENTITIES] = []
+            await connect()
+        await data[STORE].async_save(store_data())
 
+        expiration_time = data[CREDENTIALS].expiration
+        _LOGGER.debug(
+            f"[{config_entry.title}] Credentials expire at: {datetime.datetime.fromtimestamp(expiration_time)}"
+        )
         data[EXPIRATION_LISTENER] = async_track_point_in_utc_time(
             hass,
             setup_connection,
             datetime.datetime.fromtimestamp(expiration_time - 60),
         )
 
-    await setup_connection("Initial setup")
+    async def refresh_cache():
+        from .api import refresh_cache
+
+        try:
+            iot_devices = await refresh_cache(
+                api=data[API],
+                email=email,
+                password=password,
+                cache=data[CACHE],
+            )
+        except Exception as error:
+            _LOGGER.debug(f"[{config_entry.title}] Cache refresh failed: {error}")
+            return
+        await data[STORE].async_save(store_data())
+        known = {device.info.thing_name for device in data[DEVICES]}
+        if {iot_device.get("thingName") for iot_device in iot_devices} - known:
+            _LOGGER.info(
+                f"[{config_entry.title}] Device list changed, reload the integration to add new devices"
+            )
+
+    async def initial_connection(now=None):
+        try:
+            await setup_connection("Initial setup")
+        except Exception as error:
+            if data.get(UNLOADED):
+                return
+            _LOGGER.warning(
+                f"[{config_entry.title}] Connection failed, showing restored state and retrying in {CONNECT_RETRY_INTERVAL}s: {error}"
+            )
+            data[EXPIRATION_LISTENER] = async_call_later(
+                hass, CONNECT_RETRY_INTERVAL, initial_connection
+            )
+            return
+        if cached:
+            await refresh_cache()
+
+    from .api import restore_devices
+    from .api.bootstrap import BOOTSTRAP_POOL
+    from .api.const import CRT_LOG_FILE
+    from .api.crt_log import CRT_LOG_BRIDGE
+    from .api.util import Metrics, StageTimings
+
+    await hass.async_add_executor_job(CRT_LOG_BRIDGE.start, hass.config.path(CRT_LOG_FILE))
+    data[STORE] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}")
+    data[CACHE] = await data[STORE].async_load() or {}
+    cached = bool(data[CACHE])
+    data[CLIENT_BOOTSTRAP] = BOOTSTRAP_POOL.acquire()
+    data[STAGE_TIMINGS] = StageTimings()
+    data[METRICS] = Metrics()
+    if (restored := restore_devices(data[CACHE])) is not None:
+        # Entities are set up from the last known state while the connection
+        # is made in the background, so HA startup never waits on AWS IoT.
+        _LOGGER.debug(f"[{config_entry.title}] Restored {len(restored)} device(s) from storage")
+        data[DEVICES] = restored
+        data[ENTITIES] = {}
+        data[FAVORITES_MANAGERS] = {}
+    else:
+        try:
+            await setup_connection("Initial setup")
+        except Exception:
+            BOOTSTRAP_POOL.release(data[CLIENT_BOOTSTRAP])
+            raise
+        if cached:
+            config_entry.async_create_background_task(
+                hass, refresh_cache(), f"{DOMAIN}_{config_entry.entry_id}_refresh_cache"
+            )
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][config_entry.entry_id] = data
 
-    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    capabilities = set().union(*(device.capabilities for device in data[DEVICES]))
+    # Platform modules are imported in the executor, not on the event loop.
+    platforms = await hass.async_add_executor_job(platform_capabilities)
+    data[LOADED_PLATFORMS] = [
+        platform
+        for platform in PLATFORMS
+        if not platforms[platform].isdisjoint(capabilities)
+    ]
+    await hass.config_entries.async_forward_entry_setups(config_entry, data[LOADED_PLATFORMS])
+
+    if restored is not None:
+        # Started only once every entity is indexed, so all of them are
+        # rebound to the live devices.
+        config_entry.async_create_background_task(
+            hass, initial_connection(), f"{DOMAIN}_{config_entry.entry_id}_connect"
+        )
 
     return True
 
@@ -114,25 +280,128 @@ async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry):
     await hass.config_entries.async_reload(config_entry.entry_id)
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry):
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}").async_remove()
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     _LOGGER.debug(f"[{config_entry.title}] Unload entry")
-    from awscrt.mqtt import Connection
+    from .api import async_close_snapshot_writers
+    from .api.bootstrap import BOOTSTRAP_POOL
 
     unload_ok = await hass.config_entries.async_unload_platforms(
-        config_entry, PLATFORMS
+        config_entry, hass.data[DOMAIN][config_entry.entry_id][LOADED_PLATFORMS]
     )
     if unload_ok:
-        mqtt_connection: Connection = hass.data[DOMAIN][config_entry.entry_id][MQTT_CONNECTION]
-        try:
-            mqtt_connection.disconnect().result()
-        except Exception as error:
-            _LOGGER.debug(f"[{config_entry.title}] mqtt_connection disconnect failed during unload: {error}")
-        hass.data[DOMAIN][config_entry.entry_id][EXPIRATION_LISTENER]()
+        data = hass.data[DOMAIN][config_entry.entry_id]
+        data[UNLOADED] = True
+        # The background connection may not have finished before unload.
+        if (mqtt_connection := data.get(MQTT_CONNECTION)) is not None:
+            try:
+                await asyncio.wrap_future(mqtt_connection.disconnect())
+            except Exception as error:
+                _LOGGER.debug(f"[{config_entry.title}] mqtt_connection disconnect failed during unload: {error}")
+        if (remove_listener := data.get(EXPIRATION_LISTENER)) is not None:
+            remove_listener()
+        await async_close_snapshot_writers(data[DEVICES])
+        BOOTSTRAP_POOL.release(hass.data[DOMAIN][config_entry.entry_id][CLIENT_BOOTSTRAP])
         hass.data[DOMAIN].pop(config_entry.entry_id)
 
     return unload_ok
 
 
+def register_entities(entry: dict, entities: list[HatchEntity]) -> None:
+    """Index entities by device MAC address for rebinding after reconnects."""
+    for entity in entities:
+        entry[ENTITIES].setdefault(entity.device.info.mac_address, []).append(entity)
+
+
+def unregister_entity(entry: dict, entity: HatchEntity) -> None:
+    entities = entry[ENTITIES].get(entity.device.info.mac_address, [])
+    if entity in entities:
+        entities.remove(entity)
+
+
+class HatchFavoritesManager:
+    """Keep one entity per favorite preset or program of a device.
+
+    Watches the device's presets or programs and adds or removes entities in
+    place as favorites change, without reloading the config entry.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: dict,
+        device: HatchEntity.HatchDevice,
+        state_key: str,
+        create_entity: Callable[[Any], HatchEntity],
+        async_add_entities: AddEntitiesCallback,
+    ) -> None:
+        """Initialize manager."""
+        self.hass = hass
+        self.entry = entry
+        self.device = device
+        self.state_key = state_key
+        self.create_entity = create_entity
+        self.async_add_entities = async_add_entities
+        self.entities: dict[int, HatchEntity] = {}
+        entry[FAVORITES_MANAGERS].setdefault(device.info.mac_address, []).append(self)
+
+    def start(self) -> None:
+        self.device.register_callback(self._sync, {self.state_key})
+        self._sync()
+
+    def replace_device(self, device) -> None:
+        self.device.remove_callback(self._sync)
+        self.device = device
+        self.start()
+
+    def _sync(self) -> None:
+        if self.state_key not in self.device.state:
+            # Not reported yet, e.g. right after a reconnect.
+            return
+        favorites = {
+            item.index: item
+            for item in getattr(self.device, self.state_key)
+            if item.is_favorite
+        }
+        for index in [index for index in self.entities if index not in favorites]:
+            entity = self.entities.pop(index)
+            _LOGGER.debug(f"[{self.device.info.name}] Removing {self.state_key} entity: {index}")
+            unregister_entity(self.entry, entity)
+            # Only the entity is removed, its registry entry keeps the user's
+            # customizations in case the favorite comes back.
+            self.hass.async_create_task(entity.async_remove(force_remove=True))
+        added = []
+        for index, item in favorites.items():
+            if index not in self.entities:
+                _LOGGER.debug(f"[{self.device.info.name}] Adding {self.state_key} entity: {index}")
+                self.entities[index] = self.create_entity(item)
+                added.append(self.entities[index])
+        if added:
+            register_entities(self.entry, added)
+            self.async_add_entities(added)
+
+
+def hatch_command(func: Callable) -> Callable:
+    """Raise a service error for commands sent before the device is connected.
+
+    Entities restored from the cache keep their state until the device is
+    rebound after connecting, so a service call can reach a device without a
+    shadow client.
+    """
+
+    @wraps(func)
+    async def wrapper(self: HatchEntity, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await func(self, *args, **kwargs)
+        except NotConnectedError as error:
+            raise HomeAssistantError(str(error)) from error
+
+    return wrapper
+
+
 class HatchEntity(Entity):
     """Representation of a Hatch entity."""
 
@@ -147,23 +416,31 @@ class HatchEntity(Entity):
     ) -> None:
         """Initialize device."""
         self.device = device
-        self.device.register_callback(self._update_local_state)
         self.entity_description = entity_description
+        self.device.register_callback(self._update_local_state, self.state_keys)
 
     def replace_device(self, device) -> None:
         self.device.remove_callback(self._update_local_state)
         self.device = device
-        self.device.register_callback(self._update_local_state)
+        self.device.register_callback(self._update_local_state, self.state_keys)
 
     async def async_added_to_hass(self) -> None:
         if self.device.is_connected:
             self._update_local_state()
 
+    async def async_will_remove_from_hass(self) -> None:
+        self.device.remove_callback(self._update_local_state)
+
     def _update_local_state(self) -> None:
         if self.platform is None:
             return
         _LOGGER.debug(f"[{self.entity_id}] Updating Home Assistant state")
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
+
+    @property
+    def state_keys(self) -> set[str] | None:
+        """Return the top-level device state keys this entity depends on."""
+        return getattr(self.entity_description, "state_keys", None)
 
     @property
     def should_poll(self) -> bool:
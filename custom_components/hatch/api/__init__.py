@@ -7,25 +7,42 @@ from aiohttp import (
 )
 import asyncio
 from awscrt import io
-from awscrt.auth import AwsCredentialsProvider
+from awscrt.auth import AwsCredentials, AwsCredentialsProvider
+from awscrt.mqtt import Connection
 from awsiot.mqtt_connection_builder import websockets_with_default_aws_signing
 from awsiot.iotshadow import IotShadowClient
+from copy import deepcopy
 from functools import partial
-import json
 import logging
 from re import sub, IGNORECASE
+import time
+from typing import Callable
 from uuid import uuid4
 
 from .const import (
     API_URL,
+    CACHE_AUTH_TOKEN,
+    CACHE_AWS_CREDENTIALS,
+    CACHE_AWS_TOKEN,
+    CACHE_EXPIRATION_MARGIN,
+    CACHE_IOT_DEVICES,
+    CACHE_SHADOWS,
     DEFAULT_SAVE_ENABLED,
     PRODUCT_REST_MINI,
     PRODUCT_REST_PLUS,
     USER_AGENT,
 )
+from .device import Device
+from .dispatcher import Dispatcher
 from .rest_mini import RestMini
 from .rest_plus import RestPlus
+from .router import ShadowRouter
 from .util import (
+    AuthError,
+    Metrics,
+    ParsedResponse,
+    SnapshotWriter,
+    StageTimings,
     async_save_response,
     request_with_logging,
     request_with_logging_and_errors,
@@ -41,87 +58,343 @@ async def get_devices(
     on_connection_interrupted=None,
     on_connection_resumed=None,
     save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
+    client_bootstrap: io.ClientBootstrap = None,
+    timings: StageTimings = None,
+    cache: dict = None,
+    connection_factory: Callable[..., Connection] = websockets_with_default_aws_signing,
+    metrics: Metrics = None,
 ):
     loop = asyncio.get_running_loop()
-    if _LOGGER.isEnabledFor(logging.DEBUG):
-        await loop.run_in_executor(None, io.init_logging, io.LogLevel.Debug, "hatch_rest_api-aws_mqtt.log")
+    if client_bootstrap is None:
+        client_bootstrap = io.ClientBootstrap.get_or_create_static_default()
+    if timings is None:
+        timings = StageTimings()
+    if cache is None:
+        cache = {}
+    if metrics is None:
+        metrics = Metrics()
     api = Hatch(
         client_session=client_session,
         save_response_enabled=save_response_enabled,
-    )
-    token = await api.login(email=email, password=password)
-    iot_devices = await api.iot_devices(auth_token=token)
-    aws_token = await api.token(auth_token=token)
-    aws_http: AwsHttp = AwsHttp(api.api_session)
-    aws_credentials = await aws_http.aws_credentials(
-        region=aws_token["region"],
-        identityId=aws_token["identityId"],
-        aws_token=aws_token["token"],
-    )
-    credentials_provider = AwsCredentialsProvider.new_static(
-        aws_credentials["Credentials"]["AccessKeyId"],
-        aws_credentials["Credentials"]["SecretKey"],
-        session_token=aws_credentials["Credentials"]["SessionToken"],
-    )
-    event_loop_group = io.EventLoopGroup(1)
-    host_resolver = io.DefaultHostResolver(event_loop_group)
-    client_bootstrap = io.ClientBootstrap(event_loop_group, host_resolver)
-    endpoint = aws_token["endpoint"].lstrip("https://")
-    safe_email = sub("[^a-z]", "", email, flags=IGNORECASE).lower()
-    mqtt_connection = await loop.run_in_executor(
-        None,
-        partial(
-            websockets_with_default_aws_signing,
-            region=aws_token["region"],
-            credentials_provider=credentials_provider,
-            keep_alive_secs=30,
-            client_bootstrap=client_bootstrap,
-            endpoint=endpoint,
-            client_id=f"{USER_AGENT}/{safe_email}/{str(uuid4())}",
-            on_connection_interrupted=on_connection_interrupted,
-            on_connection_resumed=on_connection_resumed,
-        ),
+        metrics=metrics,
     )
 
-    try:
-        connect_future = await loop.run_in_executor(None, mqtt_connection.connect)
-        await loop.run_in_executor(None, connect_future.result)
-        _LOGGER.debug("mqtt connection connected")
-    except Exception as exception:
-        _LOGGER.error(f"MQTT connection failed with exception {exception}")
-        raise exception
-
-    shadow_client = IotShadowClient(mqtt_connection)
+    async def fetch_iot_devices(token: str, use_cache: bool) -> list[dict]:
+        if use_cache and cache.get(CACHE_IOT_DEVICES) is not None:
+            return cache[CACHE_IOT_DEVICES]
+        iot_devices = await timings.measure("iot_devices", api.iot_devices(auth_token=token))
+        cache[CACHE_IOT_DEVICES] = iot_devices
+        return iot_devices
 
-    def create_device(iot_device):
-        if iot_device["product"] == PRODUCT_REST_MINI:
-            return RestMini(
-                info=iot_device,
-                shadow_client=shadow_client,
-                save_response_enabled=save_response_enabled,
+    async def connect(token: str, use_cache: bool) -> tuple[Connection, Credentials]:
+        if use_cache and (cached := cached_aws_credentials(cache)) is not None:
+            aws_token, aws_credentials = cached
+        else:
+            aws_token, aws_credentials = await fetch_aws_credentials(
+                api=api, auth_token=token, timings=timings, cache=cache
             )
-        elif iot_device["product"] == PRODUCT_REST_PLUS:
-            return RestPlus(
-                info=iot_device,
-                shadow_client=shadow_client,
-                save_response_enabled=save_response_enabled,
+        credentials = Credentials(aws_credentials["Credentials"])
+        endpoint = aws_token["endpoint"].lstrip("https://")
+        safe_email = sub("[^a-z]", "", email, flags=IGNORECASE).lower()
+        mqtt_connection = await loop.run_in_executor(
+            None,
+            partial(
+                connection_factory,
+                region=aws_token["region"],
+                credentials_provider=credentials.provider,
+                keep_alive_secs=30,
+                client_bootstrap=client_bootstrap,
+                endpoint=endpoint,
+                client_id=f"{USER_AGENT}/{safe_email}/{str(uuid4())}",
+                on_connection_interrupted=on_connection_interrupted,
+                on_connection_resumed=on_connection_resumed,
+            ),
+        )
+        metrics.increment("mqtt_connects")
+        try:
+            await timings.measure(
+                "mqtt_connect",
+                metrics.measure("mqtt_connect", asyncio.wrap_future(mqtt_connection.connect())),
             )
+            _LOGGER.debug("mqtt connection connected")
+        except asyncio.CancelledError:
+            # The native connect carries on without us, make sure it ends.
+            mqtt_connection.disconnect()
+            raise
+        except Exception as exception:
+            _LOGGER.error(f"MQTT connection failed with exception {exception}")
+            raise exception
+        return mqtt_connection, credentials
 
-    devices = map(create_device, iot_devices)
+    async def bootstrap(token: str, use_cache: bool) -> tuple[list[dict], Connection, Credentials]:
+        # login ─┬─ iot_devices ─────────────────────────┬─ devices
+        #        └─ token ── cognito ── mqtt_connect ────┘
+        iot_devices, connected = await asyncio.gather(
+            fetch_iot_devices(token, use_cache),
+            connect(token, use_cache),
+            return_exceptions=True,
+        )
+        if isinstance(connected, BaseException):
+            raise connected
+        if isinstance(iot_devices, BaseException):
+            await asyncio.wrap_future(connected[0].disconnect())
+            raise iot_devices
+        return iot_devices, *connected
+
+    result = None
+    if (token := cache.get(CACHE_AUTH_TOKEN)) is not None:
+        api.auth_token = token
+        try:
+            result = await bootstrap(token, use_cache=True)
+        except Exception as error:
+            # Not only an expired session, cached IoT credentials can be
+            # refused by the broker too, so start over from a fresh login.
+            _LOGGER.debug(f"Connecting with cached session failed, logging in again: {error!r}")
+    if result is None:
+        token = await timings.measure("login", api.login(email=email, password=password))
+        cache[CACHE_AUTH_TOKEN] = token
+        result = await bootstrap(token, use_cache=False)
+    iot_devices, mqtt_connection, credentials = result
+
+    shadow_client = IotShadowClient(mqtt_connection)
+    try:
+        devices = await timings.measure(
+            "devices",
+            async_create_devices(
+                iot_devices=iot_devices,
+                shadow_client=shadow_client,
+                save_response_enabled=save_response_enabled,
+                dispatcher=Dispatcher(loop),
+                snapshot_writer=SnapshotWriter(loop) if save_response_enabled else None,
+                router=ShadowRouter(mqtt_connection),
+            ),
+        )
+    except BaseException:
+        # Nothing else holds the connection yet, including on cancellation.
+        mqtt_connection.disconnect()
+        raise
+    _LOGGER.debug(f"Connection stage timings: {timings.as_dict()}")
     return (
         api,
         mqtt_connection,
-        list(devices),
-        aws_credentials["Credentials"]["Expiration"],
+        devices,
+        credentials,
+    )
+
+
+def cached_aws_credentials(cache: dict) -> tuple[dict, dict] | None:
+    aws_token = cache.get(CACHE_AWS_TOKEN)
+    aws_credentials = cache.get(CACHE_AWS_CREDENTIALS)
+    if aws_token is None or aws_credentials is None:
+        return None
+    if aws_credentials["Credentials"]["Expiration"] - CACHE_EXPIRATION_MARGIN < time.time():
+        return None
+    return aws_token, aws_credentials
+
+
+def restore_devices(
+    cache: dict,
+    save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
+) -> list[Device] | None:
+    # Devices rebuilt from the last known device list and reported state.
+    # They have no shadow client, so they can be shown but not controlled.
+    iot_devices = cache.get(CACHE_IOT_DEVICES)
+    shadows = cache.get(CACHE_SHADOWS)
+    if not iot_devices or not shadows:
+        return None
+    devices = []
+    for iot_device in iot_devices:
+        device = create_device(iot_device, None, save_response_enabled)
+        if device is None:
+            continue
+        if (shadow := shadows.get(device.info.thing_name)) is not None:
+            device._apply_reported(shadow["version"], shadow["reported"])
+        devices.append(device)
+    return devices
+
+
+def cache_shadows(cache: dict, devices: list[Device]) -> dict:
+    shadows = cache.setdefault(CACHE_SHADOWS, {})
+    for device in devices:
+        if device.state:
+            shadows[device.info.thing_name] = {
+                "version": device.document_version,
+                "reported": deepcopy(device.reported_state),
+            }
+    return cache
+
+
+async def async_close_snapshot_writers(devices: list[Device]) -> None:
+    writers = {device.snapshot_writer for device in devices if device.snapshot_writer is not None}
+    await asyncio.gather(*(writer.async_close() for writer in writers))
+
+
+async def refresh_cache(api: Hatch, email: str, password: str, cache: dict) -> list[dict]:
+    try:
+        iot_devices = await api.iot_devices(auth_token=api.auth_token)
+    except AuthError:
+        _LOGGER.debug("Cached Hatch session expired, logging in again")
+        cache[CACHE_AUTH_TOKEN] = await api.login(email=email, password=password)
+        iot_devices = await api.iot_devices(auth_token=api.auth_token)
+    cache[CACHE_IOT_DEVICES] = iot_devices
+    return iot_devices
+
+
+async def fetch_aws_credentials(
+    api: Hatch,
+    auth_token: str,
+    timings: StageTimings = None,
+    cache: dict = None,
+) -> tuple[dict, dict]:
+    if timings is None:
+        timings = StageTimings()
+    aws_token = await timings.measure("token", api.token(auth_token=auth_token))
+    aws_http: AwsHttp = AwsHttp(api.api_session, api.metrics)
+    aws_credentials = await timings.measure(
+        "cognito",
+        aws_http.aws_credentials(
+            region=aws_token["region"],
+            identityId=aws_token["identityId"],
+            aws_token=aws_token["token"],
+        ),
+    )
+    if cache is not None:
+        cache[CACHE_AWS_TOKEN] = aws_token
+        cache[CACHE_AWS_CREDENTIALS] = aws_credentials
+    return aws_token, aws_credentials
+
+
+async def rotate_credentials(
+    api: Hatch,
+    email: str,
+    password: str,
+    credentials: Credentials,
+    mqtt_connection: Connection,
+    devices: list[Device],
+    timings: StageTimings = None,
+    cache: dict = None,
+) -> None:
+    # Only the credentials behind the connection's provider are replaced, the
+    # connection, subscriptions and device objects are kept as they are.
+    if timings is None:
+        timings = StageTimings()
+    try:
+        _, aws_credentials = await fetch_aws_credentials(
+            api=api, auth_token=api.auth_token, timings=timings, cache=cache
+        )
+    except AuthError:
+        _LOGGER.debug("Hatch session expired, logging in again")
+        token = await timings.measure("login", api.login(email=email, password=password))
+        if cache is not None:
+            cache[CACHE_AUTH_TOKEN] = token
+        _, aws_credentials = await fetch_aws_credentials(
+            api=api, auth_token=token, timings=timings, cache=cache
+        )
+    credentials.update(aws_credentials["Credentials"])
+    api.metrics.increment("credential_rotations")
+
+    async def reconnect() -> None:
+        await asyncio.wrap_future(mqtt_connection.disconnect())
+        await asyncio.wrap_future(mqtt_connection.connect())
+        resubscribe_future, _ = mqtt_connection.resubscribe_existing_topics()
+        await asyncio.wrap_future(resubscribe_future)
+
+    await timings.measure("mqtt_connect", api.metrics.measure("mqtt_connect", reconnect()))
+    _LOGGER.debug("mqtt connection reconnected with rotated credentials")
+    await timings.measure(
+        "devices",
+        asyncio.gather(*(device.async_refresh() for device in devices)),
     )
+    _LOGGER.debug(f"Credential rotation stage timings: {timings.as_dict()}")
+
+
+class Credentials:
+
+    def __init__(self, credentials: dict):
+        self.update(credentials)
+
+    def update(self, credentials: dict) -> None:
+        self.access_key_id = credentials["AccessKeyId"]
+        self.secret_key = credentials["SecretKey"]
+        self.session_token = credentials["SessionToken"]
+        self.expiration = credentials["Expiration"]
+
+    def _get_credentials(self) -> AwsCredentials:
+        return AwsCredentials(
+            self.access_key_id,
+            self.secret_key,
+            session_token=self.session_token,
+        )
+
+    @property
+    def provider(self) -> AwsCredentialsProvider:
+        # A delegate provider is asked for credentials on every (re)connect, so
+        # rotating them never requires building a new connection.
+        return AwsCredentialsProvider.new_delegate(self._get_credentials)
+
+
+def create_device(
+    iot_device: dict,
+    shadow_client: IotShadowClient,
+    save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
+    dispatcher: Dispatcher | None = None,
+    snapshot_writer: SnapshotWriter | None = None,
+) -> Device | None:
+    if iot_device["product"] == PRODUCT_REST_MINI:
+        return RestMini(
+            info=iot_device,
+            shadow_client=shadow_client,
+            save_response_enabled=save_response_enabled,
+            dispatcher=dispatcher,
+            snapshot_writer=snapshot_writer,
+        )
+    elif iot_device["product"] == PRODUCT_REST_PLUS:
+        return RestPlus(
+            info=iot_device,
+            shadow_client=shadow_client,
+            save_response_enabled=save_response_enabled,
+            dispatcher=dispatcher,
+            snapshot_writer=snapshot_writer,
+        )
+    _LOGGER.debug(f"Skipping unsupported product: {iot_device['product']}")
+    return None
+
+
+async def async_create_devices(
+    iot_devices: list[dict],
+    shadow_client: IotShadowClient,
+    save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
+    dispatcher: Dispatcher | None = None,
+    snapshot_writer: SnapshotWriter | None = None,
+    router: ShadowRouter | None = None,
+) -> list[Device]:
+    # Subscriptions must be acknowledged before requesting shadows, so setup
+    # costs two broker round trips no matter how many devices there are.
+    if dispatcher is None:
+        dispatcher = Dispatcher(asyncio.get_running_loop())
+    devices = []
+    for iot_device in iot_devices:
+        device = create_device(
+            iot_device, shadow_client, save_response_enabled, dispatcher, snapshot_writer
+        )
+        if device is not None:
+            devices.append(device)
+    if router is not None:
+        for device in devices:
+            router.register(device)
+    if router is None or not await router.async_subscribe():
+        await asyncio.gather(*(device.async_subscribe() for device in devices))
+    await asyncio.gather(*(device.async_refresh() for device in devices))
+    return devices
 
 
 class AwsHttp:
-    def __init__(self, client_session: ClientSession = None):
+    def __init__(self, client_session: ClientSession = None, metrics: Metrics = None):
         if client_session is None:
             self.api_session = ClientSession(raise_for_status=True)
         else:
             self.api_session = client_session
+        self.metrics = metrics if metrics is not None else Metrics()
 
     async def cleanup_client_session(self):
         await self.api_session.close()
@@ -144,13 +417,13 @@ class AwsHttp:
             "content-type": "application/x-amz-json-1.1",
             "X-Amz-Target": "AWSCognitoIdentityService.GetCredentialsForIdentity",
         }
-        response: ClientResponse = (
-            await self._post_request_with_logging_and_errors_raised(
+        response: ParsedResponse = await self.metrics.measure(
+            "rest_cognito",
+            self._post_request_with_logging_and_errors_raised(
                 url=url, json_body=json_body, headers=headers
-            )
+            ),
         )
-        data = await response.read()
-        return json.loads(data)
+        return response.json
 
 
 class Hatch:
@@ -158,12 +431,15 @@ class Hatch:
             self,
             client_session: ClientSession = None,
             save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
+            metrics: Metrics = None,
     ):
         if client_session is None:
             self.api_session = ClientSession(raise_for_status=True)
         else:
             self.api_session = client_session
+        self.metrics = metrics if metrics is not None else Metrics()
         self.save_response_enabled = save_response_enabled
+        self.auth_token = None
 
     async def cleanup_client_session(self):
         await self.api_session.close()
@@ -194,45 +470,50 @@ class Hatch:
             "email": email,
             "password": password,
         }
-        response: ClientResponse = (
-            await self._post_request_with_logging_and_errors_raised(
+        response: ParsedResponse = await self.metrics.measure(
+            "rest_login",
+            self._post_request_with_logging_and_errors_raised(
                 url=url, json_body=json_body
-            )
+            ),
         )
-        response_json = await response.json()
+        response_json = response.json
         await async_save_response(response_json, "login", self.save_response_enabled)
-        return response_json["token"]
+        self.auth_token = response_json["token"]
+        return self.auth_token
 
     async def member(self, auth_token: str):
         url = API_URL + "service/app/v2/member"
-        response: ClientResponse = (
-            await self._get_request_with_logging_and_errors_raised(
+        response: ParsedResponse = await self.metrics.measure(
+            "rest_member",
+            self._get_request_with_logging_and_errors_raised(
                 url=url, auth_token=auth_token
-            )
+            ),
         )
-        response_json = await response.json()
+        response_json = response.json
         await async_save_response(response_json, "member", self.save_response_enabled)
         return response_json["payload"]
 
     async def iot_devices(self, auth_token: str):
         url = API_URL + "service/app/iotDevice/v2/fetch"
         params = {"iotProducts": "restPlus, restMini, restore"}
-        response: ClientResponse = (
-            await self._get_request_with_logging_and_errors_raised(
+        response: ParsedResponse = await self.metrics.measure(
+            "rest_iot_devices",
+            self._get_request_with_logging_and_errors_raised(
                 url=url, auth_token=auth_token, params=params,
-            )
+            ),
         )
-        response_json = await response.json()
+        response_json = response.json
         await async_save_response(response_json, "iot_devices", self.save_response_enabled)
         return response_json["payload"]
 
     async def token(self, auth_token: str):
         url = API_URL + "service/app/restPlus/token/v1/fetch"
-        response: ClientResponse = (
-            await self._get_request_with_logging_and_errors_raised(
+        response: ParsedResponse = await self.metrics.measure(
+            "rest_token",
+            self._get_request_with_logging_and_errors_raised(
                 url=url, auth_token=auth_token
-            )
+            ),
         )
-        response_json = await response.json()
+        response_json = response.json
         await async_save_response(response_json, "token", self.save_response_enabled)
         return response_json["payload"]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from awscrt import io
+import logging
+import os
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PoolEntry:
+
+    def __init__(self, threads: int):
+        self.threads = threads
+        self.event_loop_group = io.EventLoopGroup(threads)
+        self.host_resolver = io.DefaultHostResolver(self.event_loop_group)
+        self.client_bootstrap = io.ClientBootstrap(self.event_loop_group, self.host_resolver)
+        self.references = 0
+
+
+class ClientBootstrapPool:
+    """Process-wide, reference-counted client bootstraps shared by connections.
+
+    Each connection gets a single-threaded event loop group of its own until
+    the thread count reaches the cap (the CPU count by default), after which
+    connections share the least loaded group. The pool never runs more threads
+    than it has live references, and groups are dropped when their last
+    connection releases them.
+    """
+
+    def __init__(self, max_threads: int | None = None):
+        self.max_threads = max_threads or os.cpu_count() or 1
+        self._entries: list[PoolEntry] = []
+        self._lock = threading.Lock()
+
+    @property
+    def references(self) -> int:
+        return sum(entry.references for entry in self._entries)
+
+    @property
+    def thread_count(self) -> int:
+        return sum(entry.threads for entry in self._entries)
+
+    def acquire(self) -> io.ClientBootstrap:
+        with self._lock:
+            if self.thread_count < self.max_threads and all(
+                entry.references >= entry.threads for entry in self._entries
+            ):
+                entry = PoolEntry(1)
+                self._entries.append(entry)
+                _LOGGER.debug(f"Created client bootstrap with {entry.threads} thread(s)")
+            else:
+                entry = min(self._entries, key=lambda entry: entry.references / entry.threads)
+            entry.references += 1
+            return entry.client_bootstrap
+
+    def release(self, client_bootstrap: io.ClientBootstrap) -> None:
+        with self._lock:
+            for entry in self._entries:
+                if entry.client_bootstrap is client_bootstrap:
+                    entry.references -= 1
+                    if entry.references <= 0:
+                        self._entries.remove(entry)
+                        _LOGGER.debug(f"Released client bootstrap with {entry.threads} thread(s)")
+                    return
+
+    def as_dict(self) -> dict:
+        return {
+            "event_loop_groups": len(self._entries),
+            "references": self.references,
+            "thread_count": self.thread_count,
+        }
+
+
+BOOTSTRAP_POOL = ClientBootstrapPool()
@@ -1,3 +1,6 @@
+from collections.abc import Mapping
+from types import MappingProxyType
+
 SENSITIVE_FIELD_NAMES = [
     "username",
     "password",
@@ -32,8 +35,42 @@ REST_PLUS_TRACKS = {
     14: "Rock-a-bye Baby",
 }
 
+
+class TrackCatalog:
+    """Immutable track lookups shared by every device of a product."""
+
+    __slots__ = ("by_id", "by_name", "sounds")
+
+    def __init__(self, tracks: Mapping[int, str]):
+        self.by_id = MappingProxyType(dict(tracks))
+        self.by_name = MappingProxyType({name: track for track, name in tracks.items()})
+        self.sounds = tuple(sorted(name for track, name in tracks.items() if track))
+
+
+REST_MINI_TRACK_CATALOG = TrackCatalog(REST_MINI_TRACKS)
+REST_PLUS_TRACK_CATALOG = TrackCatalog(REST_PLUS_TRACKS)
+
+DEFAULT_COMMAND_INTERVAL = 0.2
 DEFAULT_SAVE_ENABLED = False
+DEFAULT_SAVE_INTERVAL = 10
 DEFAULT_SAVE_LOCATION = f"/config/custom_components/hatch/api/responses"
+DEFAULT_SAVE_MAX_PENDING = 32
+
+SHADOW_GET_ACCEPTED_TOPIC = "$aws/things/{thing_name}/shadow/get/accepted"
+SHADOW_UPDATE_ACCEPTED_TOPIC = "$aws/things/{thing_name}/shadow/update/accepted"
+SHADOW_UPDATE_REJECTED_TOPIC = "$aws/things/{thing_name}/shadow/update/rejected"
+
+CRT_LOGGER_NAME = "awscrt"
+CRT_LOG_FILE = "hatch_aws_mqtt.log"
+CRT_LOG_MAX_BYTES = 1024 * 1024
+CRT_LOG_BACKUP_COUNT = 2
+CRT_LOG_RATE = 50
+CRT_LOG_BURST = 200
+
+METRICS_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS_MAX_INFLIGHT = 32
+
+OPTIMISTIC_TIMEOUT = 10
 
 CLOCK_FORMAT_OFF_12H = 0
 CLOCK_FORMAT_OFF_24H = 2048
@@ -62,4 +99,11 @@ PRODUCT_MODEL_MAP = {
 
 USER_AGENT = "hatch_rest_api"
 
+CACHE_AUTH_TOKEN = "auth_token"
+CACHE_AWS_CREDENTIALS = "aws_credentials"
+CACHE_AWS_TOKEN = "aws_token"
+CACHE_IOT_DEVICES = "iot_devices"
+CACHE_SHADOWS = "shadows"
+CACHE_EXPIRATION_MARGIN = 300
+
 API_URL: str = "https://data.hatchbaby.com/"
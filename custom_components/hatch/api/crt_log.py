@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from awscrt import io
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import re
+import threading
+import time
+
+from .const import (
+    CRT_LOG_BACKUP_COUNT,
+    CRT_LOG_BURST,
+    CRT_LOG_MAX_BYTES,
+    CRT_LOG_RATE,
+    CRT_LOGGER_NAME,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+LINE_PATTERN = re.compile(rb"^\[(?P<level>[A-Z]+)\] (?P<message>.*)$")
+
+LEVELS = {
+    b"TRACE": logging.DEBUG - 5,
+    b"DEBUG": logging.DEBUG,
+    b"INFO": logging.INFO,
+    b"WARN": logging.WARNING,
+    b"ERROR": logging.ERROR,
+    b"FATAL": logging.CRITICAL,
+}
+
+
+def crt_log_level(logger: logging.Logger) -> io.LogLevel:
+    # Only a level set on the awscrt logger itself counts. Inheriting from
+    # the root logger would turn on per-frame CRT logging whenever Home
+    # Assistant's default level is debug.
+    level = logger.level
+    if level == logging.NOTSET:
+        return io.LogLevel.Warn
+    if level < logging.DEBUG:
+        return io.LogLevel.Trace
+    if level < logging.INFO:
+        return io.LogLevel.Debug
+    if level < logging.WARNING:
+        return io.LogLevel.Info
+    if level < logging.ERROR:
+        return io.LogLevel.Warn
+    if level < logging.CRITICAL:
+        return io.LogLevel.Error
+    return io.LogLevel.Fatal
+
+
+class CrtLogBridge:
+    """Forward awscrt's native log output to a Python logger.
+
+    The CRT writes into a pipe that a daemon thread drains into a rotating
+    file, so native threads never wait on disk. At most ``rate`` lines per
+    second (bursting to ``burst``) are kept and the rest are counted as
+    dropped. The native level is Warn unless the ``awscrt`` logger has a level
+    of its own, independent of the integration's and the root logger's. Lines
+    below that level are never formatted by the CRT; rate limiting only bounds
+    what reaches the file. CRT logging is process-wide, so it is set up once.
+    """
+
+    def __init__(
+            self,
+            logger_name: str = CRT_LOGGER_NAME,
+            rate: float = CRT_LOG_RATE,
+            burst: int = CRT_LOG_BURST,
+    ):
+        self.logger = logging.getLogger(logger_name)
+        self.rate = rate
+        self.burst = burst
+        self.dropped = 0
+        self.forwarded = 0
+        self._dropped_since_report = 0
+        self._level: io.LogLevel | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def start(
+            self,
+            path: str,
+            max_bytes: int = CRT_LOG_MAX_BYTES,
+            backup_count: int = CRT_LOG_BACKUP_COUNT,
+    ) -> None:
+        with self._lock:
+            if self._thread is not None:
+                self.update_level()
+                return
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.propagate = False
+            read_fd, write_fd = os.pipe()
+            self._thread = threading.Thread(
+                target=self._run, args=(read_fd,), name="awscrt-log-bridge", daemon=True
+            )
+            self._thread.start()
+            self._level = crt_log_level(self.logger)
+            io.init_logging(self._level, f"/dev/fd/{write_fd}")
+            _LOGGER.debug(f"Forwarding awscrt logs at {self._level.name} to {path}")
+
+    def update_level(self) -> None:
+        # The native level can be changed after init, e.g. once the awscrt
+        # logger level has been changed through Home Assistant.
+        level = crt_log_level(self.logger)
+        if level != self._level:
+            io.set_log_level(level)
+            self._level = level
+            _LOGGER.debug(f"awscrt log level set to {level.name}")
+
+    def _allow(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _run(self, read_fd: int) -> None:
+        with os.fdopen(read_fd, "rb") as pipe:
+            for line in pipe:
+                if not self._allow():
+                    self.dropped += 1
+                    self._dropped_since_report += 1
+                    continue
+                if self._dropped_since_report:
+                    self.logger.warning(
+                        f"[awscrt-log-bridge] {self._dropped_since_report} line(s) dropped by rate limit"
+                    )
+                    self._dropped_since_report = 0
+                self._forward(line.rstrip())
+
+    def _forward(self, line: bytes) -> None:
+        match = LINE_PATTERN.match(line)
+        if match is None:
+            level, message = logging.INFO, line
+        else:
+            level = LEVELS.get(match["level"], logging.INFO)
+            message = match["message"]
+        text = message.decode(errors="replace")
+        self.forwarded += 1
+        self.logger.log(level, text)
+        if level >= logging.ERROR:
+            _LOGGER.log(level, f"awscrt: {text}")
+
+    def as_dict(self) -> dict:
+        return {
+            "level": self._level.name if self._level is not None else None,
+            "forwarded": self.forwarded,
+            "dropped": self.dropped,
+        }
+
+
+CRT_LOG_BRIDGE = CrtLogBridge()
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import Callable
 import logging
+import threading
+import time
+from typing import Any
+from uuid import uuid4
 
 from awscrt import mqtt
 from awsiot import iotshadow
 from awsiot.iotshadow import (
+    ErrorResponse,
     IotShadowClient,
     GetShadowResponse,
     UpdateShadowResponse,
@@ -12,8 +20,13 @@ from awsiot.iotshadow import (
     ShadowState,
 )
 
+from .dispatcher import Dispatcher
+from .util import Metrics, NotConnectedError, SnapshotWriter
 from .const import (
+    DEFAULT_COMMAND_INTERVAL,
     DEFAULT_SAVE_ENABLED,
+    METRICS_MAX_INFLIGHT,
+    OPTIMISTIC_TIMEOUT,
     PRODUCT_MODEL_MAP,
 )
 
@@ -37,35 +50,90 @@ class Info:
         self.model = PRODUCT_MODEL_MAP.get(self.product, self.product)
 
 
-class Device:
+class OptimisticUpdate:
+    """A command's desired state, shown until the device reports back.
+
+    ``desired`` only holds the values the device hasn't confirmed yet.
+    """
+
+    __slots__ = ("desired", "client_token", "deadline")
+
+    def __init__(self, desired: dict):
+        self.desired = desired
+        self.client_token: str | None = None
+        self.deadline: asyncio.TimerHandle | None = None
+
+
+class Device(ABC):
+
+    # Attributes entities can be built from, declared per class so platform
+    # setup never has to evaluate state-dependent properties to find them.
+    capabilities: frozenset[str] = frozenset(
+        {
+            "command_round_trip",
+            "shadow_updates_received",
+            "update_processing_time",
+        }
+    )
+    indexed_views: tuple[str, ...] = ()
 
     def __init__(
             self,
             info: dict,
             shadow_client: IotShadowClient,
             save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
+            command_interval: float = DEFAULT_COMMAND_INTERVAL,
+            dispatcher: Dispatcher | None = None,
+            snapshot_writer: SnapshotWriter | None = None,
     ):
+        self.command_interval = command_interval
+        self.dispatcher = dispatcher
         self.document_version = -1
         self.info = Info(info)
+        self.metrics = Metrics()
         self.previous_state = None
+        self.reported_state = {}
         self.save_response_enabled = save_response_enabled
         self.shadow_client = shadow_client
+        self.snapshot_writer = snapshot_writer
         self.state = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._inflight: dict[str, float] = {}
+        self._inflight_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._optimistic: list[OptimisticUpdate] = []
+        self._pending_desired: dict = {}
+        self._pending_futures: list[asyncio.Future] = []
+        self._views: dict[str, Any] = {}
 
-        def update_shadow_accepted(response: UpdateShadowResponse):
+    async def async_subscribe(self) -> None:
+        def on_update_shadow_accepted(response: UpdateShadowResponse):
             self._on_update_shadow_accepted(response)
 
         (
             update_accepted_subscribed_future,
             _,
-        ) = shadow_client.subscribe_to_update_shadow_accepted(
+        ) = self.shadow_client.subscribe_to_update_shadow_accepted(
+            request=iotshadow.UpdateShadowSubscriptionRequest(
+                thing_name=self.info.thing_name
+            ),
+            qos=mqtt.QoS.AT_LEAST_ONCE,
+            callback=on_update_shadow_accepted,
+        )
+
+        def on_update_shadow_rejected(response: ErrorResponse):
+            self._on_update_shadow_rejected(response)
+
+        (
+            update_rejected_subscribed_future,
+            _,
+        ) = self.shadow_client.subscribe_to_update_shadow_rejected(
             request=iotshadow.UpdateShadowSubscriptionRequest(
                 thing_name=self.info.thing_name
             ),
             qos=mqtt.QoS.AT_LEAST_ONCE,
-            callback=update_shadow_accepted,
+            callback=on_update_shadow_rejected,
         )
-        update_accepted_subscribed_future.result()
 
         def on_get_shadow_accepted(response: GetShadowResponse):
             self._on_get_shadow_accepted(response)
@@ -73,43 +141,72 @@ class Device:
         (
             get_accepted_subscribed_future,
             _,
-        ) = shadow_client.subscribe_to_get_shadow_accepted(
+        ) = self.shadow_client.subscribe_to_get_shadow_accepted(
             request=iotshadow.GetShadowSubscriptionRequest(thing_name=self.info.thing_name),
             qos=mqtt.QoS.AT_LEAST_ONCE,
             callback=on_get_shadow_accepted,
         )
-        get_accepted_subscribed_future.result()
-        self.refresh()
+        await asyncio.gather(
+            asyncio.wrap_future(update_accepted_subscribed_future),
+            asyncio.wrap_future(update_rejected_subscribed_future),
+            asyncio.wrap_future(get_accepted_subscribed_future),
+        )
 
     def _setup_callbacks(self):
-        self._callbacks = set()
+        self._callbacks = {}
 
-    def register_callback(self, callback) -> None:
+    def register_callback(self, callback, state_keys: set[str] | None = None) -> None:
         if not hasattr(self, "_callbacks"):
             self._setup_callbacks()
-        self._callbacks.add(callback)
+        self._callbacks[callback] = frozenset(state_keys) if state_keys else None
 
     def remove_callback(self, callback) -> None:
         if not hasattr(self, "_callbacks"):
             self._setup_callbacks()
-        self._callbacks.discard(callback)
+        self._callbacks.pop(callback, None)
 
-    def publish_updates(self) -> None:
+    def publish_updates(self, changed_keys: set[str] | None = None) -> None:
         if not hasattr(self, "_callbacks"):
             self._setup_callbacks()
-        _LOGGER.debug(f"[{self.info.name}] Publishing updates")
-        for callback in self._callbacks:
-            callback()
-
-    def refresh(self):
-        _LOGGER.debug("Requesting current shadow state...")
-        result = self.shadow_client.publish_get_shadow(
-            request=iotshadow.GetShadowRequest(
-                thing_name=self.info.thing_name, client_token=None
-            ),
-            qos=mqtt.QoS.AT_LEAST_ONCE,
-        ).result()
-        _LOGGER.debug(f"result: {result}")
+        _LOGGER.debug(f"[{self.info.name}] Publishing updates: {changed_keys}")
+        # Connectivity changes availability of every entity.
+        notify_all = changed_keys is None or "connected" in changed_keys
+        start = time.monotonic()
+        notified = 0
+        for callback, state_keys in list(self._callbacks.items()):
+            if notify_all or state_keys is None or not state_keys.isdisjoint(changed_keys):
+                callback()
+                notified += 1
+        self.metrics.increment("callbacks", notified)
+        self.metrics.observe("callback_fanout", time.monotonic() - start)
+
+    async def async_refresh(self) -> None:
+        _LOGGER.debug(f"[{self.info.name}] Requesting current shadow state...")
+        result = await asyncio.wrap_future(
+            self.shadow_client.publish_get_shadow(
+                request=iotshadow.GetShadowRequest(
+                    thing_name=self.info.thing_name, client_token=None
+                ),
+                qos=mqtt.QoS.AT_LEAST_ONCE,
+            )
+        )
+        _LOGGER.debug(f"[{self.info.name}] result: {result}")
+
+    def _has_changed(self, current: Any, update: Any) -> bool:
+        if isinstance(update, dict):
+            if not isinstance(current, dict):
+                return True
+            return any(
+                self._has_changed(current.get(key), value)
+                for key, value in update.items()
+            )
+        return current != update
+
+    def _changed_keys(self, update: dict) -> set[str]:
+        return {
+            key for key, value in update.items()
+            if self._has_changed(self.state.get(key), value)
+        }
 
     def _merge_state(self, current: dict, update: dict):
         for key, value in update.items():
@@ -119,35 +216,256 @@ class Device:
                 current[key] = value
         return current
 
+    def _view(self, key: str, factory: Callable[[dict], Any]) -> Any:
+        # Parsed views of a state subtree are built on first access and kept
+        # until an update touches that subtree.
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = factory(self.state.get(key, {}))
+        return view
+
+    def _indexed_view(self, key: str, factory: Callable[[str, dict], Any]) -> list[Any]:
+        states = self.state.get(key, {})
+        views = self._views.setdefault(key, {})
+        for index, state in states.items():
+            if index not in views:
+                views[index] = factory(index, state)
+        return [views[index] for index in states]
+
+    def _indexed_item(self, key: str, index: str, factory: Callable[[str, dict], Any]) -> Any:
+        # A single item of an indexed view, without building the others.
+        state = self.state.get(key, {}).get(index)
+        if state is None:
+            return None
+        views = self._views.setdefault(key, {})
+        view = views.get(index)
+        if view is None:
+            view = views[index] = factory(index, state)
+        return view
+
+    def _invalidate_views(self, update: dict) -> None:
+        for key, value in update.items():
+            if key in self.indexed_views and isinstance(value, dict):
+                views = self._views.get(key, {})
+                for index in value:
+                    views.pop(index, None)
+            else:
+                self._views.pop(key, None)
+
     def _on_update_shadow_accepted(self, response: UpdateShadowResponse):
-        if response.version < self.document_version:
-            return
+        if response.client_token is not None:
+            with self._inflight_lock:
+                published = self._inflight.pop(response.client_token, None)
+            if published is not None:
+                self.metrics.observe("publish_accepted", time.monotonic() - published)
         if response.state:
             if response.state.reported:
-                self.document_version = response.version
-                self._update_local_state(response.state.reported)
+                self._on_reported(response.version, response.state.reported)
+
+    def _on_update_shadow_rejected(self, response: ErrorResponse):
+        if response is not None and response.client_token is not None:
+            self._call_on_loop(
+                self._roll_back,
+                response.client_token,
+                f"update rejected ({response.code}): {response.message}",
+            )
 
     def _on_get_shadow_accepted(self, response: GetShadowResponse):
-        if response.version < self.document_version:
-            return
         if response.state:
             if response.state.delta:
                 pass
 
             if response.state.reported:
-                self.document_version = response.version
-                self._update_local_state(response.state.reported)
+                self._on_reported(response.version, response.state.reported)
+
+    def _on_reported(self, version: int, reported: dict) -> None:
+        # Called from awscrt's event loop thread, state is only touched once
+        # the dispatcher has handed the update to the asyncio loop.
+        self.metrics.increment("shadow_updates_received")
+        self._call_on_loop(self._apply_reported, version, reported)
+
+    def _call_on_loop(self, callback: Callable[..., set[str]], *args) -> None:
+        # Entities and timers may only be touched from the event loop, so
+        # shadow events are never applied on awscrt's thread.
+        if self.dispatcher is None:
+            raise RuntimeError(f"[{self.info.name}] No dispatcher to hand shadow events to the event loop")
+        self.dispatcher.call(self, callback, *args)
+
+    def _apply_reported(self, version: int, reported: dict) -> set[str]:
+        if version < self.document_version:
+            self.metrics.increment("shadow_updates_stale")
+            return set()
+        self.document_version = version
+        start = time.monotonic()
+        self._merge_state(current=self.reported_state, update=reported)
+        # Reports can be stale or about something else entirely, so a command
+        # is only confirmed value by value. Anything the device never reports
+        # stays overlaid until the command's deadline.
+        confirmed = []
+        for update in self._optimistic:
+            self._confirm(update.desired, reported)
+            if not update.desired:
+                confirmed.append(update)
+        if confirmed:
+            self.metrics.increment("optimistic_confirmed", len(confirmed))
+        changed_keys = self._reconcile(reported, confirmed)
+        self.metrics.observe("merge", time.monotonic() - start)
+        if changed_keys:
+            self.metrics.increment("shadow_updates_applied")
+        return changed_keys
+
+    def _reconcile(self, reported: dict | None, settled: list[OptimisticUpdate]) -> set[str]:
+        # Local state is the reported state with every unsettled command's
+        # desired state on top. Settled commands fall back to reported values.
+        for update in settled:
+            self._optimistic.remove(update)
+            if update.deadline is not None:
+                update.deadline.cancel()
+        if not settled and not self._optimistic:
+            return self._update_local_state(reported) if reported else set()
+        fragment = self._merge_state(current={}, update=reported or {})
+        for update in settled:
+            self._merge_state(current=fragment, update=self._extract(self.reported_state, update.desired))
+        for update in self._optimistic:
+            self._merge_state(current=fragment, update=update.desired)
+        return self._update_local_state(fragment) if fragment else set()
+
+    def _confirm(self, desired: dict, reported: dict) -> None:
+        # Drops the desired values the report matches, in place.
+        for key in [key for key in desired if key in reported]:
+            value = desired[key]
+            if isinstance(value, dict):
+                if isinstance(reported[key], dict):
+                    self._confirm(value, reported[key])
+                    if not value:
+                        del desired[key]
+            elif reported[key] == value:
+                del desired[key]
+
+    def _extract(self, source: dict, shape: dict) -> dict:
+        # The values of source at the paths in shape. Paths the device never
+        # reported are left out, there is nothing to fall back to.
+        extracted = {}
+        for key, value in shape.items():
+            if key not in source:
+                continue
+            if not isinstance(value, dict):
+                extracted[key] = source[key]
+            elif isinstance(source[key], dict) and (nested := self._extract(source[key], value)):
+                extracted[key] = nested
+        return extracted
+
+    def _roll_back(self, client_token: str, reason: str) -> set[str]:
+        rolled_back = [update for update in self._optimistic if update.client_token == client_token]
+        if not rolled_back:
+            return set()
+        # Values the device already reports don't need reverting, so only
+        # count a rollback when entities actually change back.
+        if changed_keys := self._reconcile(None, rolled_back):
+            _LOGGER.warning(f"[{self.info.name}] Reverting optimistic state, {reason}")
+            self.metrics.increment("optimistic_rollbacks", len(rolled_back))
+        return changed_keys
+
+    def _expire(self, client_token: str) -> None:
+        if changed_keys := self._roll_back(
+            client_token, f"not confirmed by the device within {OPTIMISTIC_TIMEOUT}s"
+        ):
+            self.publish_updates(changed_keys)
+
+    @abstractmethod
+    def _update_local_state(self, state: dict) -> set[str]:
+        """Merge a state fragment into local state and return the changed keys."""
+
+    def _save_state(self) -> None:
+        if self.save_response_enabled and self.snapshot_writer is not None:
+            self.snapshot_writer.submit(self.reported_state, self.info.name)
+
+    async def async_update(self, desired_state: dict) -> None:
+        # Commands issued within one command interval are merged and sent as
+        # a single shadow update, so slider drags don't flood the broker.
+        if self.shadow_client is None:
+            # Restored from storage, the connection hasn't been made yet.
+            raise NotConnectedError(f"{self.info.name} is not connected to Hatch yet")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_desired = self._merge_state(
+            current=self._pending_desired, update=desired_state
+        )
+        self._pending_futures.append(future)
+        # Entities show the desired state right away, until the device
+        # reports back or the command is rolled back. Devices only report
+        # values that change, so values already expected are confirmed now.
+        update = OptimisticUpdate(self._merge_state(current={}, update=desired_state))
+        expected = self._extract(self.reported_state, update.desired)
+        for pending in self._optimistic:
+            self._merge_state(expected, self._extract(pending.desired, update.desired))
+        self._confirm(update.desired, expected)
+        if update.desired:
+            self._optimistic.append(update)
+        if changed_keys := self._update_local_state(desired_state):
+            self.publish_updates(changed_keys)
+        if self._flush_handle is None:
+            delay = max(0.0, self._last_flush + self.command_interval - loop.time())
+            self._flush_handle = loop.call_later(delay, self._flush_pending)
+        await future
+
+    def _flush_pending(self) -> None:
+        desired_state, futures = self._pending_desired, self._pending_futures
+        self._flush_handle = None
+        self._pending_desired, self._pending_futures = {}, []
+        loop = asyncio.get_running_loop()
+        self._last_flush = loop.time()
+        _LOGGER.debug(f"[{self.info.name}] Sending {len(futures)} coalesced command(s): {desired_state}")
+        self.metrics.increment("commands", len(futures))
+        self.metrics.increment("commands_published")
+        client_token = str(uuid4())
+        published = time.monotonic()
+        with self._inflight_lock:
+            # Tokens whose accepted reply never arrived are dropped oldest first.
+            while len(self._inflight) >= METRICS_MAX_INFLIGHT:
+                self._inflight.pop(next(iter(self._inflight)))
+            self._inflight[client_token] = published
+        for update in self._optimistic:
+            if update.client_token is None:
+                update.client_token = client_token
+                update.deadline = loop.call_later(OPTIMISTIC_TIMEOUT, self._expire, client_token)
+
+        def resolve(publish_future: asyncio.Future) -> None:
+            if publish_future.cancelled() or publish_future.exception() is not None:
+                self.metrics.increment("commands_failed")
+                with self._inflight_lock:
+                    self._inflight.pop(client_token, None)
+                if changed_keys := self._roll_back(client_token, "publish failed"):
+                    self.publish_updates(changed_keys)
+            else:
+                self.metrics.observe("publish_ack", time.monotonic() - published)
+            for future in futures:
+                if future.done():
+                    continue
+                if publish_future.cancelled():
+                    future.cancel()
+                elif publish_future.exception() is not None:
+                    future.set_exception(publish_future.exception())
+                else:
+                    future.set_result(None)
 
-    def _update(self, desired_state):
         request: UpdateShadowRequest = UpdateShadowRequest(
             thing_name=self.info.thing_name,
+            client_token=client_token,
             state=ShadowState(
                 desired=desired_state,
             ),
         )
-        self.shadow_client.publish_update_shadow(
-            request, mqtt.QoS.AT_LEAST_ONCE
-        ).result()
+        try:
+            publish_future = asyncio.wrap_future(
+                self.shadow_client.publish_update_shadow(
+                    request, mqtt.QoS.AT_LEAST_ONCE
+                )
+            )
+        except Exception as error:
+            publish_future = loop.create_future()
+            publish_future.set_exception(error)
+        publish_future.add_done_callback(resolve)
 
     @property
     def firmware_version(self) -> str | None:
@@ -156,3 +474,15 @@ class Device:
     @property
     def is_connected(self) -> bool:
         return bool(self.state.get("connected"))
+
+    @property
+    def shadow_updates_received(self) -> int:
+        return self.metrics.counter("shadow_updates_received")
+
+    @property
+    def command_round_trip(self) -> float | None:
+        return self.metrics.percentile("publish_accepted", 0.95)
+
+    @property
+    def update_processing_time(self) -> float | None:
+        return self.metrics.percentile("merge", 0.95)
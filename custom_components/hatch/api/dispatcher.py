@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from .device import Device
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    """Hand shadow updates from awscrt threads over to the event loop.
+
+    Updates that arrive before the loop gets to them are applied together and
+    every device publishes once for all of them.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._pending: deque[tuple[Device, Callable[..., set[str]], tuple, float]] = deque()
+        self._scheduled = False
+
+    def call(self, device: Device, callback: Callable[..., set[str]], *args) -> None:
+        # Any shadow event for a device, applied in arrival order with reported
+        # updates. The callback returns the state keys it changed.
+        self._pending.append((device, callback, args, time.monotonic()))
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self) -> None:
+        with self._lock:
+            self._scheduled = False
+        changed: dict[Device, set[str]] = {}
+        now = time.monotonic()
+        while self._pending:
+            device, callback, args, received = self._pending.popleft()
+            device.metrics.observe("dispatch_delay", now - received)
+            changed_keys = callback(*args)
+            if changed_keys:
+                changed.setdefault(device, set()).update(changed_keys)
+        for device, changed_keys in changed.items():
+            device.publish_updates(changed_keys)
@@ -2,12 +2,11 @@ from __future__ import annotations
 
 import logging
 
-from .const import REST_MINI_TRACKS
+from .const import REST_MINI_TRACK_CATALOG, TrackCatalog
 from .device import Device
 from .util import (
     api_to_pct,
     pct_to_api,
-    save_response,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -15,30 +14,40 @@ _LOGGER = logging.getLogger(__name__)
 
 class Audio:
 
-    def __init__(self, state: dict):
+    __slots__ = ("playing", "track", "_volume", "volume", "name", "image")
+
+    def __init__(self, state: dict, catalog: TrackCatalog = REST_MINI_TRACK_CATALOG):
         self.playing = state.get("playing")
         self.track = state.get("sound", {}).get("id")
         self._volume = state.get("sound", {}).get("v")
         self.volume = api_to_pct(self._volume)
-        self.name = str(REST_MINI_TRACKS[self.track]) if self.track else None
+        self.name = catalog.by_id.get(self.track) if self.track else None
         self.image = f"rest_mini/{self.track}" if self.name != "Heartbeat" else None
-        self.list = list(REST_MINI_TRACKS.values())[1:]
 
 
 class State:
 
-    def __init__(self, state: dict):
-        self.audio = Audio(state.get("current", {}))
+    __slots__ = ("audio",)
+
+    def __init__(self, audio: Audio):
+        self.audio = audio
 
 
 class RestMini(Device):
 
-    def _update_local_state(self, state):
+    capabilities = Device.capabilities | {"sound_machine"}
+    track_catalog = REST_MINI_TRACK_CATALOG
+
+    def _update_local_state(self, state) -> set[str]:
         _LOGGER.debug(f"[{self.info.name}] Updating API state: {state}")
-        self.previous_state = State(state=self.state)
+        changed_keys = self._changed_keys(state)
+        if not changed_keys:
+            return changed_keys
+        self.previous_state = State(audio=self.audio)
         self.state = self._merge_state(current=self.state, update=state)
-        save_response(self.state, self.info.name, self.save_response_enabled)
-        self.publish_updates()
+        self._invalidate_views(state)
+        self._save_state()
+        return changed_keys
 
     @property
     def sound_machine(self):
@@ -46,18 +55,18 @@ class RestMini(Device):
 
     @property
     def audio(self):
-        return Audio(self.state.get("current", {}))
+        return self._view("current", lambda state: Audio(state, self.track_catalog))
 
     @property
     def is_audio_on(self) -> bool:
         return bool(self.audio.playing == "remote")
 
-    def set_audio(self, playing: bool = True, track: str = None, volume: int = None):
+    async def async_set_audio(self, playing: bool = True, track: str = None, volume: int = None):
         data, sound = {}, {}
         if playing is not None:
             data["playing"] = "remote" if playing else "none"
         if track is not None:
-            sound["id"] = list(REST_MINI_TRACKS.keys())[list(REST_MINI_TRACKS.values()).index(track)]
+            sound["id"] = self.track_catalog.by_name[track]
         if volume is not None:
             sound["v"] = pct_to_api(volume)
         if not data and not sound:
@@ -68,21 +77,21 @@ class RestMini(Device):
             }
         data["sound"] = sound
 
-        self._update(
+        await self.async_update(
             {
                 "current": data,
             }
         )
         _LOGGER.debug(f"[{self.info.name}] Set audio state: {data}")
 
-    def set_audio_volume(self, volume: int):
-        self.set_audio(volume=volume)
+    async def async_set_audio_volume(self, volume: int):
+        await self.async_set_audio(volume=volume)
 
-    def set_audio_track(self, track: str):
-        self.set_audio(track=track)
+    async def async_set_audio_track(self, track: str):
+        await self.async_set_audio(track=track)
 
-    def turn_on_audio(self):
-        self.set_audio(playing=True)
+    async def async_turn_on_audio(self):
+        await self.async_set_audio(playing=True)
 
-    def turn_off_audio(self):
-        self.set_audio(playing=False)
+    async def async_turn_off_audio(self):
+        await self.async_set_audio(playing=False)
@@ -10,7 +10,8 @@ from .const import (
     CLOCK_FORMAT_ON_12H,
     CLOCK_FORMAT_ON_24H,
     NO_ACTIVE_PROGRAM,
-    REST_PLUS_TRACKS,
+    REST_PLUS_TRACK_CATALOG,
+    TrackCatalog,
 )
 from .device import Device
 from .util import (
@@ -18,7 +19,6 @@ from .util import (
     api_to_pct,
     color_to_api,
     pct_to_api,
-    save_response,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -26,17 +26,20 @@ _LOGGER = logging.getLogger(__name__)
 
 class Audio:
 
-    def __init__(self, state: dict):
+    __slots__ = ("track", "_volume", "volume", "name", "image")
+
+    def __init__(self, state: dict, catalog: TrackCatalog = REST_PLUS_TRACK_CATALOG):
         self.track = state.get("t")
         self._volume = state.get("v")
         self.volume = api_to_pct(self._volume)
-        self.name = str(REST_PLUS_TRACKS[self.track]) if self.track else None
+        self.name = catalog.by_id.get(self.track) if self.track else None
         self.image = f"rest_plus/{self.track}" if self.name else None
-        self.list = list(REST_PLUS_TRACKS.values())[1:]
 
 
 class Clock:
 
+    __slots__ = ("_brightness", "brightness", "format")
+
     def __init__(self, state: dict):
         self._brightness = state.get("b")
         self.brightness = api_to_pct(self._brightness)
@@ -45,6 +48,11 @@ class Clock:
 
 class Color:
 
+    __slots__ = (
+        "_red", "_green", "_blue", "_intensity",
+        "red", "green", "blue", "intensity", "white", "rainbow",
+    )
+
     def __init__(self, state: dict):
         self._red = state.get("r")
         self._green = state.get("g")
@@ -60,9 +68,11 @@ class Color:
 
 class Preset:
 
-    def __init__(self, index: str, state: dict):
+    __slots__ = ("index", "audio", "color", "favorite", "is_favorite", "is_enabled")
+
+    def __init__(self, index: str, state: dict, catalog: TrackCatalog = REST_PLUS_TRACK_CATALOG):
         self.index = int(index)
-        self.audio = Audio(state.get("a"))
+        self.audio = Audio(state.get("a"), catalog)
         self.color = Color(state.get("c"))
         self.favorite = state.get("f")
         self.is_favorite = bool(self.favorite in [128, 192])
@@ -71,9 +81,11 @@ class Preset:
 
 class Program:
 
-    def __init__(self, index: str, state: dict):
+    __slots__ = ("index", "audio", "color", "name", "favorite", "is_favorite", "is_enabled")
+
+    def __init__(self, index: str, state: dict, catalog: TrackCatalog = REST_PLUS_TRACK_CATALOG):
         self.index = int(index)
-        self.audio = Audio(state.get("a", {}))
+        self.audio = Audio(state.get("a", {}), catalog)
         self.color = Color(state.get("c", {}))
         self.name = state.get("n")
         self.favorite = state.get("f")
@@ -83,28 +95,48 @@ class Program:
 
 class State:
 
-    def __init__(self, state: dict):
-        self.audio = Audio(state.get("a", {}))
-        self.clock = Clock(state.get("clock", {}))
-        self.color = Color(state.get("c", {}))
+    __slots__ = ("audio", "clock", "color")
+
+    def __init__(self, audio: Audio, clock: Clock, color: Color):
+        self.audio = audio
+        self.clock = clock
+        self.color = color
 
 
 class RestPlus(Device):
 
-    def _update_local_state(self, state) -> None:
+    capabilities = Device.capabilities | {
+        "active_program_name",
+        "battery_level",
+        "clock_24hr_time",
+        "clock_brightness",
+        "clock_enabled",
+        "is_device_on",
+        "nightlight",
+        "presets",
+        "programs",
+        "sound_machine",
+    }
+    indexed_views = ("presets", "programs")
+    track_catalog = REST_PLUS_TRACK_CATALOG
+
+    def _update_local_state(self, state) -> set[str]:
         _LOGGER.debug(f"[{self.info.name}] Updating API state: {state}")
-        self.previous_state = State(state=self.state)
+        changed_keys = self._changed_keys(state)
+        if not changed_keys:
+            return changed_keys
+        self.previous_state = State(audio=self.audio, clock=self.clock, color=self.color)
         self.state = self._merge_state(current=self.state, update=state)
-        save_response(self.state, self.info.name, self.save_response_enabled)
-        self.publish_updates()
+        self._invalidate_views(state)
+        self._save_state()
+        return changed_keys
 
     @property
     def is_device_on(self) -> bool:
         return bool(self.state.get("isPowered"))
 
-    @is_device_on.setter
-    def is_device_on(self, power: bool) -> None:
-        self._update(
+    async def async_set_is_device_on(self, power: bool) -> None:
+        await self.async_update(
             {
                 "isPowered": bool(power),
             }
@@ -112,9 +144,9 @@ class RestPlus(Device):
 
     @property
     def clock(self) -> Clock:
-        return Clock(self.state.get("clock", {}))
+        return self._view("clock", Clock)
 
-    def _set_clock(self, brightness: int = None, format: int = None) -> None:
+    async def _async_set_clock(self, brightness: int = None, format: int = None) -> None:
         data = {}
         if brightness is not None:
             data["b"] = pct_to_api(brightness)
@@ -126,7 +158,7 @@ class RestPlus(Device):
                 "f": self.previous_state.clock.format,
             }
 
-        self._update(
+        await self.async_update(
             {
                 "clock": data,
             }
@@ -155,25 +187,22 @@ class RestPlus(Device):
     def clock_brightness(self) -> int:
         return self.clock.brightness
 
-    @clock_brightness.setter
-    def clock_brightness(self, value: int) -> None:
-        self._set_clock(brightness=value)
+    async def async_set_clock_brightness(self, value: int) -> None:
+        await self._async_set_clock(brightness=value)
 
     @property
     def clock_enabled(self) -> bool:
         return bool(self.clock.format in CLOCK_FORMAT_ON)
 
-    @clock_enabled.setter
-    def clock_enabled(self, value: bool) -> None:
-        self._set_clock(format=self._get_clock_format(clock_enabled=value))
+    async def async_set_clock_enabled(self, value: bool) -> None:
+        await self._async_set_clock(format=self._get_clock_format(clock_enabled=value))
 
     @property
     def clock_24hr_time(self) -> bool:
         return bool(self.clock.format in CLOCK_FORMAT_24H)
 
-    @clock_24hr_time.setter
-    def clock_24hr_time(self, value: bool) -> None:
-        self._set_clock(format=self._get_clock_format(clock_24hr_time=value))
+    async def async_set_clock_24hr_time(self, value: bool) -> None:
+        await self._async_set_clock(format=self._get_clock_format(clock_24hr_time=value))
 
     @property
     def sound_machine(self) -> bool:
@@ -181,7 +210,7 @@ class RestPlus(Device):
 
     @property
     def audio(self) -> Audio:
-        return Audio(self.state.get("a", {}))
+        return self._view("a", lambda state: Audio(state, self.track_catalog))
 
     @property
     def is_audio_on(self) -> bool:
@@ -193,10 +222,10 @@ class RestPlus(Device):
             ]
         )
 
-    def set_audio(self, track: str = None, volume: int = None) -> None:
+    async def async_set_audio(self, track: str = None, volume: int = None) -> None:
         data = {}
         if track is not None:
-            data["t"] = list(REST_PLUS_TRACKS.keys())[list(REST_PLUS_TRACKS.values()).index(track)]
+            data["t"] = self.track_catalog.by_name[track]
         if volume is not None:
             data["v"] = pct_to_api(volume)
         if not data:
@@ -205,7 +234,7 @@ class RestPlus(Device):
                 "v": pct_to_api(self.previous_state.audio.volume),
             }
 
-        self._update(
+        await self.async_update(
             {
                 "isPowered": True,
                 "activePresetIndex": 0,
@@ -214,17 +243,17 @@ class RestPlus(Device):
         )
         _LOGGER.debug(f"[{self.info.name}] Set audio state: {data}")
 
-    def set_audio_volume(self, volume: int) -> None:
-        self.set_audio(volume=volume)
+    async def async_set_audio_volume(self, volume: int) -> None:
+        await self.async_set_audio(volume=volume)
 
-    def set_audio_track(self, track: str) -> None:
-        self.set_audio(track=track)
+    async def async_set_audio_track(self, track: str) -> None:
+        await self.async_set_audio(track=track)
 
-    def turn_on_audio(self) -> None:
-        self.set_audio()
+    async def async_turn_on_audio(self) -> None:
+        await self.async_set_audio()
 
-    def turn_off_audio(self) -> None:
-        self.set_audio_track("None")
+    async def async_turn_off_audio(self) -> None:
+        await self.async_set_audio_track("None")
 
     @property
     def battery_level(self) -> str | None:
@@ -236,7 +265,7 @@ class RestPlus(Device):
 
     @property
     def color(self) -> Color:
-        return Color(self.state.get("c", {}))
+        return self._view("c", Color)
 
     @property
     def is_light_on(self) -> bool:
@@ -255,7 +284,7 @@ class RestPlus(Device):
             ]
         )
 
-    def set_color(self, red: int=None, green: int=None, blue: int=None, intensity: int=None, white: bool=None, rainbow: bool=None):
+    async def async_set_color(self, red: int=None, green: int=None, blue: int=None, intensity: int=None, white: bool=None, rainbow: bool=None):
         data = {}
         if red is not None:
             data["r"] = color_to_api(red)
@@ -278,7 +307,7 @@ class RestPlus(Device):
                 "W": self.previous_state.color.white,
                 "R": self.previous_state.color.rainbow,
             }
-        self._update(
+        await self.async_update(
             {
                 "isPowered": True,
                 "activePresetIndex": 0,
@@ -286,8 +315,8 @@ class RestPlus(Device):
             }
         )
 
-    def turn_on_light(self, red, green, blue, intensity, white, rainbow):
-        self.set_color(
+    async def async_turn_on_light(self, red, green, blue, intensity, white, rainbow):
+        await self.async_set_color(
             red=red,
             green=green,
             blue=blue,
@@ -296,8 +325,8 @@ class RestPlus(Device):
             rainbow=rainbow,
         )
 
-    def turn_off_light(self):
-        self.set_color(
+    async def async_turn_off_light(self):
+        await self.async_set_color(
             red=0,
             green=0,
             blue=0,
@@ -305,9 +334,15 @@ class RestPlus(Device):
             rainbow=False,
         )
 
+    def _preset(self, index: str, state: dict) -> Preset:
+        return Preset(index, state, self.track_catalog)
+
     @property
     def presets(self) -> list[Preset]:
-        return [Preset(index, state) for index, state in self.state.get("presets", {}).items()]
+        return self._indexed_view("presets", self._preset)
+
+    def get_preset(self, index: int) -> Preset | None:
+        return self._indexed_item("presets", str(index), self._preset)
 
     @property
     def active_preset_index(self) -> int:
@@ -316,9 +351,9 @@ class RestPlus(Device):
     def is_preset_active(self, index: int) -> bool:
         return bool(self.active_preset_index == index)
 
-    def enable_preset(self, preset: Preset, enabled: bool) -> None:
+    async def async_enable_preset(self, preset: Preset, enabled: bool) -> None:
         format = 192 if enabled else 128
-        self._update(
+        await self.async_update(
             {
                 "presets": {
                     str(preset.index): {
@@ -328,8 +363,8 @@ class RestPlus(Device):
             }
         )
 
-    def set_preset(self, preset: Preset) -> None:
-        self._update(
+    async def async_set_preset(self, preset: Preset) -> None:
+        await self.async_update(
             {
                 "isPowered": True,
                 "activePresetIndex": preset.index,
@@ -348,9 +383,15 @@ class RestPlus(Device):
             }
         )
 
+    def _program(self, index: str, state: dict) -> Program:
+        return Program(index, state, self.track_catalog)
+
     @property
     def programs(self) -> list[Program]:
-        return [Program(index, state) for index, state in self.state.get("programs", {}).items()]
+        return self._indexed_view("programs", self._program)
+
+    def get_program(self, index: int) -> Program | None:
+        return self._indexed_item("programs", str(index), self._program)
 
     @property
     def active_program_index(self) -> int:
@@ -366,9 +407,9 @@ class RestPlus(Device):
                 return program.name
         return "none"
 
-    def enable_program(self, program: Program, enabled: bool) -> None:
+    async def async_enable_program(self, program: Program, enabled: bool) -> None:
         format = 192 if enabled else 128
-        self._update(
+        await self.async_update(
             {
                 "programs": {
                     str(program.index): {
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING
+
+from awscrt import mqtt
+from awsiot.iotshadow import ErrorResponse, GetShadowResponse, UpdateShadowResponse
+
+from .const import (
+    SHADOW_GET_ACCEPTED_TOPIC,
+    SHADOW_UPDATE_ACCEPTED_TOPIC,
+    SHADOW_UPDATE_REJECTED_TOPIC,
+)
+
+if TYPE_CHECKING:
+    from .device import Device
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ShadowRouter:
+    """Receive shadow replies for every device on a connection.
+
+    Three wildcard subscriptions cover all things, and messages are handed to
+    devices by thing name, so the subscription count and setup round trips
+    don't grow with the number of devices. If the broker refuses the
+    wildcards, devices subscribe to their own topics instead.
+    """
+
+    def __init__(self, mqtt_connection: mqtt.Connection):
+        self.mqtt_connection = mqtt_connection
+        self.devices: dict[str, Device] = {}
+        self.subscribed = False
+
+    def register(self, device: Device) -> None:
+        self.devices[device.info.thing_name] = device
+
+    async def async_subscribe(self) -> bool:
+        topics = (
+            (SHADOW_UPDATE_ACCEPTED_TOPIC.format(thing_name="+"), self._on_update_accepted),
+            (SHADOW_UPDATE_REJECTED_TOPIC.format(thing_name="+"), self._on_update_rejected),
+            (SHADOW_GET_ACCEPTED_TOPIC.format(thing_name="+"), self._on_get_accepted),
+        )
+        results = await asyncio.gather(
+            *(
+                asyncio.wrap_future(
+                    self.mqtt_connection.subscribe(
+                        topic=topic, qos=mqtt.QoS.AT_LEAST_ONCE, callback=callback
+                    )[0]
+                )
+                for topic, callback in topics
+            ),
+            return_exceptions=True,
+        )
+        if errors := [result for result in results if isinstance(result, BaseException)]:
+            _LOGGER.debug(f"Wildcard shadow subscriptions refused, subscribing per device: {errors}")
+            for (topic, _), result in zip(topics, results):
+                if not isinstance(result, BaseException):
+                    await asyncio.wrap_future(self.mqtt_connection.unsubscribe(topic)[0])
+            return False
+        self.subscribed = True
+        return True
+
+    def _device(self, topic: str) -> Device | None:
+        # $aws/things/<thing name>/shadow/...
+        return self.devices.get(topic.split("/", 3)[2])
+
+    def _on_update_accepted(self, topic: str, payload: bytes, **kwargs) -> None:
+        if (device := self._device(topic)) is not None:
+            device._on_update_shadow_accepted(UpdateShadowResponse.from_payload(json.loads(payload)))
+
+    def _on_update_rejected(self, topic: str, payload: bytes, **kwargs) -> None:
+        if (device := self._device(topic)) is not None:
+            device._on_update_shadow_rejected(ErrorResponse.from_payload(json.loads(payload)))
+
+    def _on_get_accepted(self, topic: str, payload: bytes, **kwargs) -> None:
+        if (device := self._device(topic)) is not None:
+            device._on_get_shadow_accepted(GetShadowResponse.from_payload(json.loads(payload)))
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import aiofiles
-from aiohttp import ClientError
+from aiohttp import ClientError, ClientResponse
+import asyncio
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import suppress
+from copy import deepcopy
+from functools import cached_property
 import logging
 import json
 import os
-from typing import Any
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable
 
 from .const import (
     DEFAULT_SAVE_ENABLED,
+    DEFAULT_SAVE_INTERVAL,
     DEFAULT_SAVE_LOCATION,
+    DEFAULT_SAVE_MAX_PENDING,
     MAX_IOT_VALUE,
+    METRICS_BUCKETS_MS,
     SENSITIVE_FIELD_NAMES,
 )
 
@@ -38,32 +50,53 @@ def clean_dictionary_for_logging(dictionary: dict[str, any]) -> dict[str, any]:
     return mutable_dictionary
 
 
+class ParsedResponse:
+    """A response whose body has been read and is decoded at most once."""
+
+    def __init__(self, response: ClientResponse, text: str):
+        self.response = response
+        self.headers = response.headers
+        self.status = response.status
+        self.text = text
+
+    @cached_property
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+async def read_response(response: ClientResponse | ParsedResponse) -> ParsedResponse:
+    if isinstance(response, ParsedResponse):
+        return response
+    return ParsedResponse(response, await response.text())
+
+
 def request_with_logging(func):
     async def request_with_logging_wrapper(*args, **kwargs):
-        url = kwargs["url"]
-        request_message = f"sending {url} request"
-        headers = kwargs.get("headers")
-        if headers is not None:
-            request_message = request_message + f"headers: {headers}"
-        json_body = kwargs.get("json_body")
-        if json_body is not None:
-            request_message = (
-                request_message
-                + f"sending {url} request with {clean_dictionary_for_logging(json_body)}"
-            )
-        _LOGGER.debug(request_message)
-        response = await func(*args, **kwargs)
-        _LOGGER.debug(
-            f"response headers:{clean_dictionary_for_logging(response.headers)}"
-        )
-        try:
-            response_json = await response.json()
+        debug_enabled = _LOGGER.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            url = kwargs["url"]
+            request_message = f"sending {url} request"
+            headers = kwargs.get("headers")
+            if headers is not None:
+                request_message = request_message + f"headers: {headers}"
+            json_body = kwargs.get("json_body")
+            if json_body is not None:
+                request_message = (
+                    request_message
+                    + f"sending {url} request with {clean_dictionary_for_logging(json_body)}"
+                )
+            _LOGGER.debug(request_message)
+        response = await read_response(await func(*args, **kwargs))
+        if debug_enabled:
             _LOGGER.debug(
-                f"response json: {clean_dictionary_for_logging(response_json)}"
+                f"response headers:{clean_dictionary_for_logging(response.headers)}"
             )
-        except Exception:
-            response_text = await response.text()
-            _LOGGER.debug(f"response raw: {response_text}")
+            try:
+                _LOGGER.debug(
+                    f"response json: {clean_dictionary_for_logging(response.json)}"
+                )
+            except Exception:
+                _LOGGER.debug(f"response raw: {response.text}")
         return response
 
     return request_with_logging_wrapper
@@ -71,8 +104,8 @@ def request_with_logging(func):
 
 def request_with_logging_and_errors(func):
     async def request_with_logging_wrapper(*args, **kwargs):
-        response = await func(*args, **kwargs)
-        response_json = await response.json()
+        response = await read_response(await func(*args, **kwargs))
+        response_json = response.json
         if response_json.get("status") == "success":
             return response
         if response_json.get("errorCode") == 1001:
@@ -107,19 +140,9 @@ def color_to_api(value: int) -> int:
     return int((value / 255) * MAX_IOT_VALUE)
 
 
-def save_response(
-        response: dict[str, Any],
-        name: str = "response",
-        save_response_enabled: bool = DEFAULT_SAVE_ENABLED,
-) -> None:
-    if save_response_enabled and response:
-        if not os.path.isdir(DEFAULT_SAVE_LOCATION):
-            os.mkdir(DEFAULT_SAVE_LOCATION)
-        name = name.replace("/", "_").replace(".", "_").replace("’", "").replace(" ", "_").lower()
-        path = f"{DEFAULT_SAVE_LOCATION}/{name}.json"
-        _LOGGER.debug(f"Saving response to {path}")
-        with open(path, "w") as file:
-            file.write(json.dumps(response, default=lambda o: "not-serializable", indent=4, sort_keys=True))
+def response_path(name: str, location: str = DEFAULT_SAVE_LOCATION) -> str:
+    name = name.replace("/", "_").replace(".", "_").replace("’", "").replace(" ", "_").lower()
+    return f"{location}/{name}.json"
 
 
 async def async_save_response(
@@ -130,13 +153,208 @@ async def async_save_response(
     if save_response_enabled and response:
         if not os.path.isdir(DEFAULT_SAVE_LOCATION):
             os.mkdir(DEFAULT_SAVE_LOCATION)
-        name = name.replace("/", "_").replace(".", "_").replace("’", "").replace(" ", "_").lower()
-        path = f"{DEFAULT_SAVE_LOCATION}/{name}.json"
+        path = response_path(name)
         _LOGGER.debug(f"Saving response to {path}")
         async with aiofiles.open(path, "w") as file:
             await file.write(json.dumps(response, default=lambda o: "not-serializable", indent=4, sort_keys=True))
 
 
+class SnapshotWriter:
+    """Periodically write the latest state of each device to disk.
+
+    Only the newest state per device is kept between writes, and at most
+    max_pending devices are queued. Submitted state is copied, and formatting
+    and the atomic file replace both run in an executor, so the update path
+    never waits on JSON encoding or disk I/O. Submitting is safe from any
+    thread; pending snapshots are written out on close.
+    """
+
+    def __init__(
+            self,
+            loop: asyncio.AbstractEventLoop,
+            interval: float = DEFAULT_SAVE_INTERVAL,
+            location: str = DEFAULT_SAVE_LOCATION,
+            max_pending: int = DEFAULT_SAVE_MAX_PENDING,
+    ):
+        self.loop = loop
+        self.interval = interval
+        self.location = location
+        self.max_pending = max_pending
+        self._closed = False
+        self._handle: asyncio.TimerHandle | None = None
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._scheduled = False
+
+    def submit(self, response: dict[str, Any], name: str = "response") -> None:
+        if not response:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            self._pending.pop(name, None)
+            self._pending[name] = deepcopy(response)
+            while len(self._pending) > self.max_pending:
+                dropped, _ = self._pending.popitem(last=False)
+                _LOGGER.debug(f"Dropping pending snapshot: {dropped}")
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self) -> None:
+        if not self._closed:
+            self._handle = self.loop.call_later(self.interval, self._flush)
+
+    def _flush(self) -> asyncio.Future:
+        self._handle = None
+        with self._lock:
+            self._scheduled = False
+            pending, self._pending = self._pending, OrderedDict()
+        snapshots = [
+            (response_path(name, self.location), response)
+            for name, response in pending.items()
+        ]
+        future = self.loop.run_in_executor(None, self._write, snapshots)
+        future.add_done_callback(self._on_written)
+        return future
+
+    def _on_written(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and (error := future.exception()) is not None:
+            _LOGGER.warning(f"Saving snapshots failed: {error!r}")
+
+    def _write(self, snapshots: list[tuple[str, dict[str, Any]]]) -> None:
+        if not snapshots:
+            return
+        os.makedirs(self.location, exist_ok=True)
+        for path, response in snapshots:
+            _LOGGER.debug(f"Saving response to {path}")
+            text = json.dumps(response, default=lambda o: "not-serializable", indent=4, sort_keys=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.location, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as file:
+                    file.write(text)
+                os.replace(temp_path, path)
+            except OSError as error:
+                _LOGGER.debug(f"Saving response to {path} failed: {error}")
+                with suppress(OSError):
+                    os.remove(temp_path)
+
+    async def async_close(self) -> None:
+        with self._lock:
+            self._closed = True
+        if self._handle is not None:
+            self._handle.cancel()
+        with suppress(Exception):
+            # Failures are already logged by _on_written.
+            await self._flush()
+
+
+class StageTimings:
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+
+    async def measure(self, stage: str, awaitable: Awaitable[Any]) -> Any:
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.stages[stage] = time.monotonic() - start
+
+    def as_dict(self) -> dict[str, float]:
+        return {stage: round(duration, 3) for stage, duration in self.stages.items()}
+
+
+class Histogram:
+    """Latency histogram over fixed millisecond buckets."""
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * (len(METRICS_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        self.counts[bisect_left(METRICS_BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.maximum = max(self.maximum, milliseconds)
+
+    def percentile(self, fraction: float) -> float | None:
+        # Upper bound of the bucket holding the percentile, so the result
+        # never understates latency.
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(METRICS_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.maximum), 3)
+        return round(self.maximum, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.maximum, 3),
+        }
+
+
+class Metrics:
+    """Counters and latency histograms for the update and command paths.
+
+    Updated from awscrt threads as well as the event loop.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    async def measure(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.observe(name, time.monotonic() - start)
+
+    def counter(self, name: str) -> int:
+        return self.counters.get(name, 0)
+
+    def percentile(self, name: str, fraction: float) -> float | None:
+        histogram = self.histograms.get(name)
+        return histogram.percentile(fraction) if histogram is not None else None
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {
+                    name: histogram.as_dict()
+                    for name, histogram in sorted(self.histograms.items())
+                },
+            }
+
+
 class BaseError(ClientError):
     pass
 
@@ -147,3 +365,7 @@ class AuthError(BaseError):
 
 class RateError(BaseError):
     pass
+
+
+class NotConnectedError(BaseError):
+    pass
@@ -15,19 +15,22 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import HatchEntity
-from .const import DOMAIN, DEVICES, ENTITIES
+from . import HatchEntity, register_entities
+from .const import DOMAIN, DEVICES
 
 @dataclass
 class HatchBinarySensorEntityDescription(BinarySensorEntityDescription):
     """Class to describe a Hatch binary sensor entity."""
 
+    state_keys: set[str] | None = None
+
 BINARY_SENSOR_DESCRIPTIONS: list[HatchBinarySensorEntityDescription] = [
     HatchBinarySensorEntityDescription(
         key="is_light_on",
         name="Color Status",
         device_class=BinarySensorDeviceClass.LIGHT,
         entity_category=EntityCategory.DIAGNOSTIC,
+        state_keys={"c"},
     ),
 ]
 
@@ -44,14 +47,14 @@ async def async_setup_entry(
 
     for device in devices:
         for description in BINARY_SENSOR_DESCRIPTIONS:
-            if hasattr(device, description.key):
+            if description.key in device.capabilities:
                 entities.append(
                     HatchBinarySensorEntity(
                         device=device,
                         entity_description=description,
                     )
                 )
-    entry[ENTITIES].extend(entities)
+    register_entities(entry, entities)
 
     async_add_entities(entities)
 
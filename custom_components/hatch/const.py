@@ -1,16 +1,36 @@
+from datetime import timedelta
 from enum import Enum
 
 # Configuration Constants
 DOMAIN = "hatch"
 
 # Home Assistant Data Storage Constants
+API = "api"
+CACHE = "cache"
+CLIENT_BOOTSTRAP = "client_bootstrap"
+CREDENTIALS = "credentials"
 DEVICES = "devices"
 EXPIRATION_LISTENER = "expiration_listener"
 ENTITIES = "entities"
+FAVORITES_MANAGERS = "favorites_managers"
+LOADED_PLATFORMS = "loaded_platforms"
+METRICS = "metrics"
 MQTT_CONNECTION = "mqtt_connection"
+STAGE_TIMINGS = "stage_timings"
+STORE = "store"
+UNLOADED = "unloaded"
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60
+
+CONNECT_RETRY_INTERVAL = 60
+
+METRICS_REFRESH_INTERVAL = timedelta(seconds=60)
 
 EFFECT_RAINBOW = "rainbow"
 
 MANUFACTURER = "Hatch"
 
-MEDIA_IMAGE_DIRECTORY = f"/config/custom_components/{DOMAIN}/api/images"
\ No newline at end of file
+MEDIA_IMAGE_CACHE_SIZE = 32
+MEDIA_IMAGE_DIRECTORY = f"/config/custom_components/{DOMAIN}/api/images"
+MEDIA_IMAGE_PRELOAD = True
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""Diagnostics support for Hatch."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DEVICES, DOMAIN, METRICS, STAGE_TIMINGS
+from .util import rgb_to_names
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    from .api.bootstrap import BOOTSTRAP_POOL
+    from .api.crt_log import CRT_LOG_BRIDGE
+
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    presets = [
+        (device, preset)
+        for device in data[DEVICES]
+        if "presets" in device.capabilities
+        for preset in device.presets
+        if None not in (preset.color.red, preset.color.green, preset.color.blue)
+    ]
+    color_names = rgb_to_names(
+        (preset.color.red, preset.color.green, preset.color.blue)
+        for _, preset in presets
+    )
+    devices = {
+        device.info.thing_name: {
+            "model": device.info.model,
+            "firmware_version": device.firmware_version,
+            "connected": device.is_connected,
+            "metrics": device.metrics.as_dict(),
+            "preset_colors": {},
+        }
+        for device in data[DEVICES]
+    }
+    for (device, preset), color_name in zip(presets, color_names):
+        devices[device.info.thing_name]["preset_colors"][preset.index] = color_name
+
+    return {
+        "client_bootstrap_pool": BOOTSTRAP_POOL.as_dict(),
+        "crt_log": CRT_LOG_BRIDGE.as_dict(),
+        "devices": devices,
+        "metrics": data[METRICS].as_dict(),
+        "stage_timings": data[STAGE_TIMINGS].as_dict(),
+    }
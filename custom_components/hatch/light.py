@@ -20,20 +20,25 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 import homeassistant.util.color as color_util
 
-from . import HatchEntity
-from .const import DOMAIN, DEVICES, EFFECT_RAINBOW, ENTITIES
+from . import HatchEntity, hatch_command, register_entities
+from .const import DOMAIN, DEVICES, EFFECT_RAINBOW
 
 @dataclass
 class HatchLightEntityDescription(LightEntityDescription):
     """Class to describe a Hatch light entity."""
 
+    state_keys: set[str] | None = None
+
 LIGHT_DESCRIPTIONS: list[HatchLightEntityDescription] = [
     HatchLightEntityDescription(
         key="nightlight",
         name="Nightlight",
+        state_keys={"c", "isPowered"},
     ),
 ]
 
+CAPABILITIES = frozenset(description.key for description in LIGHT_DESCRIPTIONS)
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -49,14 +54,14 @@ async def async_setup_entry(
 
     for device in devices:
         for description in LIGHT_DESCRIPTIONS:
-            if hasattr(device, description.key):
+            if description.key in device.capabilities:
                 entities.append(
                     HatchLightEntity(
                         device=device,
                         entity_description=description,
                     )
                 )
-    entry[ENTITIES].extend(entities)
+    register_entities(entry, entities)
 
     async_add_entities(entities)
 
@@ -116,7 +121,8 @@ class HatchLightEntity(HatchEntity, LightEntity):
         """Flag supported color modes."""
         return set([ColorMode.HS, ColorMode.WHITE])
 
-    def turn_on(self, **kwargs: Any) -> None:
+    @hatch_command
+    async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the entity on."""
         r, g, b, i, white, rainbow = None, None, None, None, None, None
 
@@ -145,7 +151,7 @@ class HatchLightEntity(HatchEntity, LightEntity):
                 white = False
                 _LOGGER.debug(f"Found ATTR_EFFECT in kwargs, got effect: {effect}")
 
-        self.device.turn_on_light(
+        await self.device.async_turn_on_light(
             red=r,
             green=g,
             blue=b,
@@ -154,6 +160,7 @@ class HatchLightEntity(HatchEntity, LightEntity):
             rainbow=rainbow,
         )
 
-    def turn_off(self, **kwargs: Any) -> None:
+    @hatch_command
+    async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the entity off."""
-        self.device.turn_off_light()
+        await self.device.async_turn_off_light()
@@ -1,7 +1,12 @@
 """Support for Hatch media player entities."""
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
+import hashlib
+import logging
+import os
+
 import aiofiles
 
 from homeassistant.components.media_player import (
@@ -16,21 +21,100 @@ from homeassistant.const import STATE_OFF, STATE_ON
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import HatchEntity
-from .const import DOMAIN, DEVICES, ENTITIES, MEDIA_IMAGE_DIRECTORY
+from . import HatchEntity, hatch_command, register_entities
+from .const import (
+    DOMAIN,
+    DEVICES,
+    MEDIA_IMAGE_CACHE_SIZE,
+    MEDIA_IMAGE_DIRECTORY,
+    MEDIA_IMAGE_PRELOAD,
+)
 
 @dataclass
 class HatchMediaPlayerEntityDescription(MediaPlayerEntityDescription):
     """Class to describe a Hatch media player entity."""
 
+    state_keys: set[str] | None = None
+
 MEDIA_PLAYER_DESCRIPTIONS: list[HatchMediaPlayerEntityDescription] = [
     HatchMediaPlayerEntityDescription(
         key="sound_machine",
         name="Sound Machine",
         device_class=MediaPlayerDeviceClass.SPEAKER,
+        state_keys={"a", "current", "isPowered"},
     ),
 ]
 
+CAPABILITIES = frozenset(description.key for description in MEDIA_PLAYER_DESCRIPTIONS)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ArtworkCache:
+    """Bounded LRU cache of artwork bytes keyed by media image hash.
+
+    Preloaded images are keyed by a hash of their content so browsers can
+    cache them; images loaded on demand fall back to their relative path.
+    """
+
+    def __init__(self, directory: str, max_size: int = MEDIA_IMAGE_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.preloaded = False
+        self._artwork: OrderedDict[str, bytes] = OrderedDict()
+        self._hashes: dict[str, str] = {}
+        self._images: dict[str, str] = {}
+
+    def image_hash(self, image: str) -> str:
+        return self._hashes.get(image, image)
+
+    def _store(self, image_hash: str, artwork: bytes) -> None:
+        self._artwork[image_hash] = artwork
+        self._artwork.move_to_end(image_hash)
+        while len(self._artwork) > self.max_size:
+            self._artwork.popitem(last=False)
+
+    def _read_images(self) -> dict[str, bytes]:
+        images = {}
+        for product in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, product)
+            if not os.path.isdir(path):
+                continue
+            for file_name in sorted(os.listdir(path)):
+                name, extension = os.path.splitext(file_name)
+                if extension == ".png":
+                    with open(os.path.join(path, file_name), "rb") as file:
+                        images[f"{product}/{name}"] = file.read()
+        return images
+
+    async def async_preload(self, hass: HomeAssistant) -> None:
+        if self.preloaded:
+            return
+        self.preloaded = True
+        try:
+            images = await hass.async_add_executor_job(self._read_images)
+        except OSError as error:
+            _LOGGER.debug(f"Preloading media images failed: {error}")
+            return
+        for image, artwork in images.items():
+            image_hash = hashlib.sha256(artwork).hexdigest()[:16]
+            self._hashes[image] = image_hash
+            self._images[image_hash] = image
+            self._store(image_hash, artwork)
+
+    async def async_get(self, image_hash: str) -> bytes:
+        if (artwork := self._artwork.get(image_hash)) is not None:
+            self._artwork.move_to_end(image_hash)
+            return artwork
+        image = self._images.get(image_hash, image_hash)
+        async with aiofiles.open(f"{self.directory}/{image}.png", "rb") as file:
+            artwork = await file.read()
+        self._store(image_hash, artwork)
+        return artwork
+
+
+ARTWORK_CACHE = ArtworkCache(MEDIA_IMAGE_DIRECTORY)
+
 
 async def async_setup_entry(
         hass: HomeAssistant,
@@ -42,16 +126,19 @@ async def async_setup_entry(
     devices = entry[DEVICES]
     entities: list[HatchMediaPlayerEntity] = []
 
+    if MEDIA_IMAGE_PRELOAD:
+        await ARTWORK_CACHE.async_preload(hass)
+
     for device in devices:
         for description in MEDIA_PLAYER_DESCRIPTIONS:
-            if hasattr(device, description.key):
+            if description.key in device.capabilities:
                 entities.append(
                     HatchMediaPlayerEntity(
                         device=device,
                         entity_description=description,
                     )
                 )
-    entry[ENTITIES].extend(entities)
+    register_entities(entry, entities)
 
     async_add_entities(entities)
 
@@ -96,7 +183,7 @@ class HatchMediaPlayerEntity(HatchEntity, MediaPlayerEntity):
     @property
     def sound_mode_list(self) -> list[str] | None:
         """List of available sound modes."""
-        return sorted(self.device.audio.list)
+        return list(self.device.track_catalog.sounds)
 
     @property
     def supported_features(self) -> int:
@@ -109,34 +196,35 @@ class HatchMediaPlayerEntity(HatchEntity, MediaPlayerEntity):
             MediaPlayerEntityFeature.VOLUME_STEP
         )
 
-    def turn_on(self):
+    @hatch_command
+    async def async_turn_on(self):
         """Turn the media player on."""
-        self.device.turn_on_audio()
+        await self.device.async_turn_on_audio()
 
-    def turn_off(self):
+    @hatch_command
+    async def async_turn_off(self):
         """Turn the media player off."""
-        self.device.turn_off_audio()
+        await self.device.async_turn_off_audio()
 
-    def set_volume_level(self, volume):
+    @hatch_command
+    async def async_set_volume_level(self, volume):
         """Set volume level, range 0..1."""
-        self.device.set_audio_volume(int(volume * 100))
+        await self.device.async_set_audio_volume(int(volume * 100))
 
-    def select_sound_mode(self, sound_mode):
+    @hatch_command
+    async def async_select_sound_mode(self, sound_mode):
         """Select sound mode."""
-        self.device.set_audio_track(sound_mode)
+        await self.device.async_set_audio_track(sound_mode)
 
     @property
     def media_image_hash(self):
         """Hash value for media image."""
-        if self.state == STATE_ON:
-            return self.device.audio.image
+        if self.state == STATE_ON and self.device.audio.image:
+            return ARTWORK_CACHE.image_hash(self.device.audio.image)
         return None
 
     async def async_get_media_image(self):
         """Fetch media image of current playing image."""
-        if self.media_image_hash:
-            path =f"{MEDIA_IMAGE_DIRECTORY}/{self.media_image_hash}.png"
-            async with aiofiles.open(path, "rb") as file:
-                artwork = await file.read()
-            return artwork, "image/png"
+        if image_hash := self.media_image_hash:
+            return await ARTWORK_CACHE.async_get(image_hash), "image/png"
         return None, None
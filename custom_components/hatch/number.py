@@ -11,13 +11,15 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import HatchEntity
-from .const import DOMAIN, DEVICES, ENTITIES
+from . import HatchEntity, hatch_command, register_entities
+from .const import DOMAIN, DEVICES
 
 @dataclass
 class HatchNumberEntityDescription(NumberEntityDescription):
     """Class to describe a Hatch number."""
 
+    state_keys: set[str] | None = None
+
 NUMBER_DESCRIPTIONS: list[HatchNumberEntityDescription] = [
     HatchNumberEntityDescription(
         key="clock_brightness",
@@ -28,9 +30,12 @@ NUMBER_DESCRIPTIONS: list[HatchNumberEntityDescription] = [
         native_step=1,
         native_unit_of_measurement=PERCENTAGE,
         icon="mdi:brightness-6",
+        state_keys={"clock"},
     ),
 ]
 
+CAPABILITIES = frozenset(description.key for description in NUMBER_DESCRIPTIONS)
+
 
 async def async_setup_entry(
         hass: HomeAssistant,
@@ -44,14 +49,14 @@ async def async_setup_entry(
 
     for device in devices:
         for description in NUMBER_DESCRIPTIONS:
-            if hasattr(device, description.key):
+            if description.key in device.capabilities:
                 entities.append(
                     HatchNumberEntity(
                         device=device,
                         entity_description=description,
                     )
                 )
-    entry[ENTITIES].extend(entities)
+    register_entities(entry, entities)
 
     async_add_entities(entities)
 
@@ -67,6 +72,7 @@ class HatchNumberEntity(HatchEntity, NumberEntity):
         return getattr(self.device, self.entity_description.key)
 
     @final
-    def set_native_value(self, value: float) -> None:
+    @hatch_command
+    async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
-        setattr(self.device, self.entity_description.key, value)
+        await getattr(self.device, f"async_set_{self.entity_description.key}")(value)
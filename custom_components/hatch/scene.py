@@ -9,6 +9,7 @@ from typing import Any
 from homeassistant.components.light import (
     ATTR_BRIGHTNESS_PCT,
     ATTR_COLOR_MODE,
+    ATTR_COLOR_NAME,
     ATTR_EFFECT,
     ATTR_RGB_COLOR,
     ColorMode,
@@ -20,18 +21,24 @@ from homeassistant.components.media_player import (
 from homeassistant.components.scene import Scene
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity import EntityCategory, EntityDescription
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import HatchEntity
+from . import HatchEntity, HatchFavoritesManager, hatch_command
 from .api.device import Device as HatchDevice
 from .api.rest_plus import Preset as HatchPreset
-from .const import DOMAIN, DEVICES, EFFECT_RAINBOW, ENTITIES
+from .const import DOMAIN, DEVICES, EFFECT_RAINBOW
+from .util import rgb_to_name
 
 @dataclass
 class HatchSceneEntityDescription(EntityDescription):
     """Class to describe a Hatch scene entity."""
 
+    state_keys: set[str] | None = None
+
+CAPABILITIES = frozenset({"presets"})
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -43,29 +50,26 @@ async def async_setup_entry(
     """Set up a Hatch scene entity based on a config entry."""
     entry = hass.data[DOMAIN][config_entry.entry_id]
     devices = entry[DEVICES]
-    entities: list[HatchSceneEntity] = []
 
     for device in devices:
-        if hasattr(device, "presets"):
-            for preset in device.presets:
-                if preset.is_favorite:
-                    _LOGGER.debug(
-                        f"[{device.info.name}] Found preset scene entity: {preset.index}",
-                    )
-                    entities.append(
-                        HatchSceneEntity(
-                            device=device,
-                            entity_description=HatchSceneEntityDescription(
-                                key=None,
-                                name=None,
-                                entity_category=EntityCategory.CONFIG,
-                            ),
-                            preset=preset,
-                        )
-                    )
-    entry[ENTITIES].extend(entities)
-
-    async_add_entities(entities)
+        if "presets" in device.capabilities:
+            HatchFavoritesManager(
+                hass=hass,
+                entry=entry,
+                device=device,
+                state_key="presets",
+                create_entity=lambda preset, device=device: HatchSceneEntity(
+                    device=device,
+                    entity_description=HatchSceneEntityDescription(
+                        key=None,
+                        name=None,
+                        entity_category=EntityCategory.CONFIG,
+                        state_keys={"presets"},
+                    ),
+                    preset=preset,
+                ),
+                async_add_entities=async_add_entities,
+            ).start()
 
 
 class HatchSceneEntity(HatchEntity, Scene):
@@ -81,21 +85,31 @@ class HatchSceneEntity(HatchEntity, Scene):
     ) -> None:
         """Initialize device."""
         super().__init__(device, entity_description)
-        self.preset = preset
+        self.preset_index = preset.index
+
+    @property
+    def preset(self) -> HatchPreset | None:
+        """Return the current state of the preset this scene activates."""
+        return self.device.get_preset(self.preset_index)
 
     @property
     def name(self) -> str:
         """Return the name of the entity."""
-        return f"{super().name} Preset {self.preset.index}"
+        return f"{super().name} Preset {self.preset_index}"
 
     @property
     def unique_id(self) -> str:
         """Return a unique ID."""
-        return f"{super().unique_id}-preset-{self.preset.index}"
+        return f"{super().unique_id}-preset-{self.preset_index}"
 
-    def activate(self, **kwargs: Any) -> None:
+    @hatch_command
+    async def async_activate(self, **kwargs: Any) -> None:
         """Activate scene. Try to get entities into requested state."""
-        self.device.set_preset(self.preset)
+        if (preset := self.preset) is None:
+            raise HomeAssistantError(
+                f"Preset {self.preset_index} is no longer available on {self.device.info.name}"
+            )
+        await self.device.async_set_preset(preset)
 
     @property
     def extra_state_attributes(self) -> Mapping[str, Any] | None:
@@ -105,28 +119,31 @@ class HatchSceneEntity(HatchEntity, Scene):
         is lowercase snake_case.
         """
         attrs = {
-            "index": self.preset.index
+            "index": self.preset_index
         }
-        if self.preset.audio.name is not None:
-            attrs[ATTR_SOUND_MODE] = self.preset.audio.name
-        if self.preset.audio.volume is not None:
-            attrs[ATTR_MEDIA_VOLUME_LEVEL] = self.preset.audio.volume
+        if (preset := self.preset) is None:
+            return attrs
+        if preset.audio.name is not None:
+            attrs[ATTR_SOUND_MODE] = preset.audio.name
+        if preset.audio.volume is not None:
+            attrs[ATTR_MEDIA_VOLUME_LEVEL] = preset.audio.volume
         if all(
             [
-                self.preset.color.red is not None,
-                self.preset.color.green is not None,
-                self.preset.color.blue is not None,
+                preset.color.red is not None,
+                preset.color.green is not None,
+                preset.color.blue is not None,
             ]
         ):
             attrs[ATTR_RGB_COLOR] = (
-                self.preset.color.red,
-                self.preset.color.green,
-                self.preset.color.blue,
+                preset.color.red,
+                preset.color.green,
+                preset.color.blue,
             )
-        if self.preset.color.intensity is not None:
-            attrs[ATTR_BRIGHTNESS_PCT] = int(self.preset.color.intensity * 100 / 255)
-        if self.preset.color.white:
+            attrs[ATTR_COLOR_NAME] = rgb_to_name(attrs[ATTR_RGB_COLOR])
+        if preset.color.intensity is not None:
+            attrs[ATTR_BRIGHTNESS_PCT] = int(preset.color.intensity * 100 / 255)
+        if preset.color.white:
             attrs[ATTR_COLOR_MODE] = ColorMode.WHITE
-        if self.preset.color.rainbow:
+        if preset.color.rainbow:
             attrs[ATTR_EFFECT] = EFFECT_RAINBOW
         return attrs
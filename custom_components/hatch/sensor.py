@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -11,24 +11,29 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE
-from homeassistant.core import HomeAssistant
+from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.typing import StateType
 
-from . import HatchEntity
-from .const import DOMAIN, DEVICES, ENTITIES
+from . import HatchEntity, register_entities
+from .const import DOMAIN, DEVICES, METRICS_REFRESH_INTERVAL
 
 @dataclass
 class HatchSensorEntityDescription(SensorEntityDescription):
     """Class to describe a Hatch sensor entity."""
 
+    state_keys: set[str] | None = None
+    refresh_interval: timedelta | None = None
+
 SENSOR_DESCRIPTIONS: list[HatchSensorEntityDescription] = [
     HatchSensorEntityDescription(
         key="active_program_name",
         name="Active Program",
         entity_category=EntityCategory.DIAGNOSTIC,
+        state_keys={"activeProgramIndex", "programs"},
     ),
     HatchSensorEntityDescription(
         key="battery_level",
@@ -37,9 +42,41 @@ SENSOR_DESCRIPTIONS: list[HatchSensorEntityDescription] = [
         state_class=SensorStateClass.MEASUREMENT,
         entity_category=EntityCategory.DIAGNOSTIC,
         native_unit_of_measurement=PERCENTAGE,
+        state_keys={"deviceInfo"},
+    ),
+    HatchSensorEntityDescription(
+        key="command_round_trip",
+        name="Command Round Trip",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_keys={"connected"},
+        refresh_interval=METRICS_REFRESH_INTERVAL,
+    ),
+    HatchSensorEntityDescription(
+        key="shadow_updates_received",
+        name="Shadow Updates Received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        state_keys={"connected"},
+        refresh_interval=METRICS_REFRESH_INTERVAL,
+    ),
+    HatchSensorEntityDescription(
+        key="update_processing_time",
+        name="Update Processing Time",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_keys={"connected"},
+        refresh_interval=METRICS_REFRESH_INTERVAL,
     ),
 ]
 
+CAPABILITIES = frozenset(description.key for description in SENSOR_DESCRIPTIONS)
+
 
 async def async_setup_entry(
         hass: HomeAssistant,
@@ -53,14 +90,14 @@ async def async_setup_entry(
 
     for device in devices:
         for description in SENSOR_DESCRIPTIONS:
-            if hasattr(device, description.key):
+            if description.key in device.capabilities:
                 entities.append(
                     HatchSensorEntity(
                         device=device,
                         entity_description=description,
                     )
                 )
-    entry[ENTITIES].extend(entities)
+    register_entities(entry, entities)
 
     async_add_entities(entities)
 
@@ -70,6 +107,19 @@ class HatchSensorEntity(HatchEntity, SensorEntity):
 
     entity_description: HatchSensorEntityDescription
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Metrics change with every message, writing them on each shadow
+        # update would add a state change (and recorder row) per message.
+        if (interval := self.entity_description.refresh_interval) is not None:
+            self.async_on_remove(
+                async_track_time_interval(self.hass, self._refresh, interval)
+            )
+
+    @callback
+    def _refresh(self, now: datetime) -> None:
+        self._update_local_state()
+
     @property
     def native_value(self) -> StateType | date | datetime:
         return getattr(self.device, self.entity_description.key)
@@ -9,22 +9,24 @@ from typing import Any
 from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import HatchEntity
+from . import HatchEntity, HatchFavoritesManager, hatch_command, register_entities
 from .api.device import Device as HatchDevice
 from .api.rest_plus import (
     Preset as HatchPreset,
     Program as HatchProgram,
 )
-from .const import DOMAIN, DEVICES, ENTITIES
+from .const import DOMAIN, DEVICES
 
 @dataclass
 class HatchSwitchEntityDescription(SwitchEntityDescription):
     """Class to describe a Hatch switch entity."""
 
     extra_attrs: dict[str, Callable] | None = None
+    state_keys: set[str] | None = None
 
 SWITCH_DESCRIPTIONS: list[HatchSwitchEntityDescription] = [
     HatchSwitchEntityDescription(
@@ -35,19 +37,24 @@ SWITCH_DESCRIPTIONS: list[HatchSwitchEntityDescription] = [
             "active_preset_index": lambda device: getattr(device, "active_preset_index"),
             "active_program_name": lambda device: getattr(device, "active_program_name"),
         },
+        state_keys={"isPowered", "activePresetIndex", "activeProgramIndex", "programs"},
     ),
     HatchSwitchEntityDescription(
         key="clock_enabled",
         name="Show Clock",
         entity_category=EntityCategory.CONFIG,
+        state_keys={"clock"},
     ),
     HatchSwitchEntityDescription(
         key="clock_24hr_time",
         name="24-Hour Time",
         entity_category=EntityCategory.CONFIG,
+        state_keys={"clock"},
     ),
 ]
 
+CAPABILITIES = frozenset(description.key for description in SWITCH_DESCRIPTIONS) | {"presets", "programs"}
+
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -64,50 +71,52 @@ async def async_setup_entry(
 
     for device in devices:
         for description in SWITCH_DESCRIPTIONS:
-            if hasattr(device, description.key):
+            if description.key in device.capabilities:
                 entities.append(
                     HatchSwitchEntity(
                         device=device,
                         entity_description=description,
                     )
                 )
-        if hasattr(device, "presets"):
-            for preset in device.presets:
-                if preset.is_favorite:
-                    _LOGGER.debug(
-                        f"[{device.info.name}] Found preset switch entity: {preset.index}",
-                    )
-                    entities.append(
-                        HatchSwitchEntity(
-                            device=device,
-                            entity_description=HatchSwitchEntityDescription(
-                                key=None,
-                                name=None,
-                                entity_category=EntityCategory.CONFIG,
-                            ),
-                            preset=preset,
-                        )
-                    )
-
-        if hasattr(device, "programs"):
-            for program in device.programs:
-                if program.is_favorite:
-                    _LOGGER.debug(
-                        f"[{device.info.name}] Found program switch entity: {program.index}",
-                    )
-                    entities.append(
-                        HatchSwitchEntity(
-                            device=device,
-                            entity_description=HatchSwitchEntityDescription(
-                                key=None,
-                                name=None,
-                                entity_category=EntityCategory.CONFIG,
-                            ),
-                            program=program,
-                        )
-                    )
-
-    entry[ENTITIES].extend(entities)
+        if "presets" in device.capabilities:
+            HatchFavoritesManager(
+                hass=hass,
+                entry=entry,
+                device=device,
+                state_key="presets",
+                create_entity=lambda preset, device=device: HatchSwitchEntity(
+                    device=device,
+                    entity_description=HatchSwitchEntityDescription(
+                        key=None,
+                        name=None,
+                        entity_category=EntityCategory.CONFIG,
+                        state_keys={"presets"},
+                    ),
+                    preset=preset,
+                ),
+                async_add_entities=async_add_entities,
+            ).start()
+
+        if "programs" in device.capabilities:
+            HatchFavoritesManager(
+                hass=hass,
+                entry=entry,
+                device=device,
+                state_key="programs",
+                create_entity=lambda program, device=device: HatchSwitchEntity(
+                    device=device,
+                    entity_description=HatchSwitchEntityDescription(
+                        key=None,
+                        name=None,
+                        entity_category=EntityCategory.CONFIG,
+                        state_keys={"programs"},
+                    ),
+                    program=program,
+                ),
+                async_add_entities=async_add_entities,
+            ).start()
+
+    register_entities(entry, entities)
 
     async_add_entities(entities)
 
@@ -126,55 +135,78 @@ class HatchSwitchEntity(HatchEntity, SwitchEntity):
     ) -> None:
         """Initialize device."""
         super().__init__(device, entity_description)
-        self.preset = preset
-        self.program = program
+        self.preset_index = preset.index if preset else None
+        self.program_index = program.index if program else None
+
+    @property
+    def preset(self) -> HatchPreset | None:
+        """Return the current state of the preset this entity controls."""
+        if self.preset_index is None:
+            return None
+        return self.device.get_preset(self.preset_index)
+
+    @property
+    def program(self) -> HatchProgram | None:
+        """Return the current state of the program this entity controls."""
+        if self.program_index is None:
+            return None
+        return self.device.get_program(self.program_index)
 
     @property
     def name(self) -> str:
         """Return the name of the entity."""
         name = super().name
-        if self.preset:
-            return f"{name} Preset {self.preset.index} Enabled"
-        elif self.program:
-            return f"{name} {self.program.name } Program Enabled"
+        if self.preset_index is not None:
+            return f"{name} Preset {self.preset_index} Enabled"
+        elif self.program_index is not None:
+            program = self.program
+            return f"{name} {program.name if program else self.program_index} Program Enabled"
         return name
 
     @property
     def unique_id(self) -> str:
         """Return a unique ID."""
         unique_id = super().unique_id
-        if self.preset:
-            return f"{unique_id}-preset-{self.preset.index}-enabled"
-        elif self.program:
-            return f"{unique_id}-program-{self.program.index}-enabled"
+        if self.preset_index is not None:
+            return f"{unique_id}-preset-{self.preset_index}-enabled"
+        elif self.program_index is not None:
+            return f"{unique_id}-program-{self.program_index}-enabled"
         return unique_id
 
     @property
     def is_on(self) -> bool:
         """Return True if entity is on."""
-        if self.preset:
-            return getattr(self.preset, "is_enabled")
-        elif self.program:
-            return getattr(self.program, "is_enabled")
+        if self.preset_index is not None:
+            return bool(self.preset and self.preset.is_enabled)
+        elif self.program_index is not None:
+            return bool(self.program and self.program.is_enabled)
         return getattr(self.device, self.entity_description.key)
 
-    def turn_on(self, **kwargs: Any) -> None:
-        """Turn the entity on."""
-        if self.preset:
-            self.device.enable_preset(self.preset, True)
-        elif self.program:
-            self.device.enable_program(self.program, True)
+    async def _async_set_enabled(self, enabled: bool) -> None:
+        if self.preset_index is not None:
+            if (preset := self.preset) is None:
+                raise HomeAssistantError(
+                    f"Preset {self.preset_index} is no longer available on {self.device.info.name}"
+                )
+            await self.device.async_enable_preset(preset, enabled)
+        elif self.program_index is not None:
+            if (program := self.program) is None:
+                raise HomeAssistantError(
+                    f"Program {self.program_index} is no longer available on {self.device.info.name}"
+                )
+            await self.device.async_enable_program(program, enabled)
         else:
-            setattr(self.device, self.entity_description.key, True)
+            await getattr(self.device, f"async_set_{self.entity_description.key}")(enabled)
+
+    @hatch_command
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn the entity on."""
+        await self._async_set_enabled(True)
 
-    def turn_off(self, **kwargs: Any) -> None:
+    @hatch_command
+    async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the entity off."""
-        if self.preset:
-            self.device.enable_preset(self.preset, False)
-        elif self.program:
-            self.device.enable_program(self.program, False)
-        else:
-            setattr(self.device, self.entity_description.key, False)
+        await self._async_set_enabled(False)
 
     @property
     def extra_state_attributes(self) -> Mapping[str, Any] | None:
@@ -1,20 +1,86 @@
 """Hatch integration."""
 from __future__ import annotations
 
+from collections.abc import Iterable, Mapping
+
 from homeassistant.util.color import COLORS, RGBColor
 
 
-def rgb_distance_between(color_1: RGBColor, color_2: RGBColor) -> float:
-    return ((color_1.r-color_2.r)**2) + ((color_1.g-color_2.g)**2) + ((color_1.b-color_2.b)**2)
+class ColorIndex:
+    """3-d tree over named colors for nearest-name lookups.
+
+    Ties are resolved in favour of the color listed first, matching a
+    linear scan over the same mapping.
+    """
+
+    def __init__(self, colors: Mapping[str, RGBColor]):
+        points = [
+            ((rgb[0], rgb[1], rgb[2]), order, name)
+            for order, (name, rgb) in enumerate(colors.items())
+        ]
+        self._root = self._build(points, 0)
+
+    def _build(self, points: list, axis: int) -> tuple | None:
+        if not points:
+            return None
+        points.sort(key=lambda point: point[0][axis])
+        median = len(points) // 2
+        next_axis = (axis + 1) % 3
+        return (
+            points[median],
+            axis,
+            self._build(points[:median], next_axis),
+            self._build(points[median + 1:], next_axis),
+        )
+
+    def nearest(self, value: Iterable[int]) -> str | None:
+        target = tuple(value)
+        best = [None, None, None]
+
+        def search(node: tuple | None) -> None:
+            if node is None:
+                return
+            (rgb, order, name), axis, left, right = node
+            distance = (
+                (rgb[0] - target[0]) ** 2
+                + (rgb[1] - target[1]) ** 2
+                + (rgb[2] - target[2]) ** 2
+            )
+            if best[0] is None or (distance, order) < (best[0], best[1]):
+                best[0], best[1], best[2] = distance, order, name
+            delta = target[axis] - rgb[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            search(near)
+            if delta * delta <= best[0]:
+                search(far)
+
+        search(self._root)
+        return best[2]
+
+    def nearest_many(self, values: Iterable[Iterable[int]]) -> list[str | None]:
+        names: dict[tuple, str | None] = {}
+        result = []
+        for value in values:
+            key = tuple(value)
+            if key not in names:
+                names[key] = self.nearest(key)
+            result.append(names[key])
+        return result
+
+
+_COLOR_INDEX: ColorIndex | None = None
+
+
+def _color_index() -> ColorIndex:
+    global _COLOR_INDEX
+    if _COLOR_INDEX is None:
+        _COLOR_INDEX = ColorIndex(COLORS)
+    return _COLOR_INDEX
 
 
 def rgb_to_name(value: RGBColor) -> str | None:
-    closest_distance: float | None  = None
-    closest_name: str | None = None
-
-    for color_name, color_rgb in COLORS.items():
-        distance = rgb_distance_between(color_rgb, value)
-        if closest_distance is None or distance < closest_distance:
-            closest_distance = distance
-            closest_name = color_name
-    return closest_name
+    return _color_index().nearest(value)
+
+
+def rgb_to_names(values: Iterable[RGBColor]) -> list[str | None]:
+    return _color_index().nearest_many(values)